@@ -4,33 +4,44 @@ Streamlit メインアプリケーション（改訂版）
 """
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, time as dt_time
 import streamlit.components.v1 as components
+from concurrent.futures import ThreadPoolExecutor
 
 # ローカルモジュール
-from data_fetcher import fetch_multi_timeframe_data, get_ticker_info
+from data_fetcher import fetch_multi_timeframe_data, get_ticker_info, get_ticker_name, get_current_price
 from indicators import add_indicators
-from patterns import detect_patterns
-from signals import generate_signal, SignalType
-from chart import create_candlestick_chart
+from signals import generate_signal, compute_tech_score, SignalType, TrendDirection
 from notifications import (
-    NotificationManager, 
-    render_notification_settings, 
+    NotificationManager,
+    render_notification_settings,
     get_webhook_notifier,
     get_browser_notification_script
 )
-from glossary import render_glossary_page
-from screener import render_screener_page
 from portfolio_manager import (
     render_asset_summary,
     render_funds_input,
     render_add_holding_form,
     render_portfolio_table,
-    render_position_calculator,
-    get_portfolio_with_prices,
-    calculate_position_size
+    render_position_calculator
 )
-from database import get_funds, init_database, sync_to_localstorage, render_data_loader
+from database import init_database, render_data_loader, flush_pending_writes
+
+# ページ設定（最初のStreamlitコマンドとして実行する）
+st.set_page_config(
+    page_title="株価シグナル監視",
+    page_icon="📈",
+    layout="wide"
+)
+
+# スクリプト実行ごとの現在時刻（同一実行内の時刻を揃え、時計の読み出しを1回にする）
+st.session_state._run_now = datetime.now()
+
+
+def get_run_now() -> datetime:
+    """現在のスクリプト実行で固定された現在時刻を取得"""
+    return st.session_state.get('_run_now') or datetime.now()
+
 
 # データベース初期化（エラー時は続行）
 try:
@@ -38,22 +49,18 @@ try:
 except Exception as e:
     print(f"Database init skipped: {e}")
 
+# 前回の実行がst.rerun()で中断された場合に備え、保存待ちのデータを書き出す
+flush_pending_writes()
+
 # 定期タスクチェック（エラー時は続行）
 try:
     from scheduled_tasks import check_and_run_scheduled_tasks
     scheduled_results = check_and_run_scheduled_tasks()
     if scheduled_results.get('morning_ran') or scheduled_results.get('afternoon_ran'):
-        print(f"Scheduled scan executed at {datetime.now()}")
+        print(f"Scheduled scan executed at {get_run_now()}")
 except Exception as e:
     print(f"Scheduled task skipped: {e}")
 
-# ページ設定
-st.set_page_config(
-    page_title="株価シグナル監視",
-    page_icon="📈",
-    layout="wide"
-)
-
 # localStorageからデータを読み込むUI
 render_data_loader()
 
@@ -62,97 +69,161 @@ if 'notification_manager' not in st.session_state:
     st.session_state.notification_manager = NotificationManager()
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = []
-if 'last_signals' not in st.session_state:
-    st.session_state.last_signals = {}
+if 'last_notify_state' not in st.session_state:
+    # {銘柄コード: (最後に通知したシグナル, 通知時刻)}
+    st.session_state.last_notify_state = {}
+
+
+# 分析結果のキャッシュTTL（秒）
+ANALYSIS_CACHE_TTL_SECONDS = 60
+
+# 一括分析の並列ワーカー数
+BATCH_MAX_WORKERS = 8
+
+# トレンド方向ごとの表示アイコン
+TREND_ICONS = {TrendDirection.UP: "🟢", TrendDirection.DOWN: "🔴"}
+
+# 分析結果表示で参照する列（close, rsi, ema_20, ema_200 の順）
+TAIL_COLUMNS = ['close', 'rsi', 'ema_20', 'ema_200']
+
+
+@st.cache_data(ttl=ANALYSIS_CACHE_TTL_SECONDS, show_spinner=False, max_entries=128)
+def _analyze_ticker_cached(ticker: str) -> dict:
+    """
+    銘柄分析の本体（キャッシュ付き）
+    
+    例外はそのまま送出するため、失敗結果はキャッシュされない
+    """
+    df_main, df_higher = fetch_multi_timeframe_data(ticker)
+    
+    # データ不足なら指標・パターン計算をせずに即失敗（前足参照のため最低2本必要）
+    if df_main is None or len(df_main) < 2 or df_higher is None or len(df_higher) < 2:
+        raise ValueError(f"分析に必要なデータが不足しています: {ticker}")
+    
+    from patterns import detect_patterns
+    
+    info = get_ticker_info(ticker)
+    df_main = add_indicators(df_main)
+    df_higher = add_indicators(df_higher)
+    df_main = detect_patterns(df_main)
+    signal_result = generate_signal(df_main, df_higher)
+    
+    return {
+        "success": True,
+        "df_main": df_main,
+        "df_higher": df_higher,
+        "info": info,
+        "signal": signal_result
+    }
 
 
 def analyze_ticker(ticker: str) -> dict:
     """銘柄を分析してシグナル情報を返す"""
     try:
-        df_main, df_higher = fetch_multi_timeframe_data(ticker)
-        info = get_ticker_info(ticker)
-        df_main = add_indicators(df_main)
-        df_higher = add_indicators(df_higher)
-        df_main = detect_patterns(df_main)
-        signal_result = generate_signal(df_main, df_higher)
-        
-        return {
-            "success": True,
-            "df_main": df_main,
-            "df_higher": df_higher,
-            "info": info,
-            "signal": signal_result
-        }
+        return _analyze_ticker_cached(ticker)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def get_watchlist_display_name(ticker: str) -> str:
+    """ウォッチリスト表示用の銘柄名を取得（銘柄名は1時間キャッシュ）"""
+    try:
+        return get_ticker_name(ticker)[:15]
+    except Exception:
+        return ticker
+
+
+def compute_market_gate(now: datetime) -> tuple:
+    """
+    通知可否の判定に使う市場セッション状態を計算
+    
+    Args:
+        now: 判定基準の現在時刻
+    
+    Returns:
+        (現在時刻, 日本株の取引時間内か, 米国株の通知対象日か)
+    """
+    # 土日チェック（0=月曜, 6=日曜）
+    is_weekday = now.weekday() < 5
+    # 日本株: 9:00-15:30 のみ通知
+    jp_open = is_weekday and dt_time(9, 0) <= now.time() <= dt_time(15, 30)
+    # 米国株: 日本時間 23:30-6:00 (サマータイム: 22:30-5:00)
+    # 簡易チェック: 営業日のみ
+    us_open = is_weekday
+    return now, jp_open, us_open
+
+
+@st.cache_resource
+def get_batch_executor() -> ThreadPoolExecutor:
+    """一括分析用の共有スレッドプールを取得"""
+    return ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+
+
+def start_batch_analysis(tickers: list) -> dict:
+    """
+    ウォッチリスト銘柄の分析を並列に投入
+    
+    ネットワークI/O待ちが支配的なため、全銘柄をまとめてスレッドプールに投入する
+    
+    Args:
+        tickers: 銘柄コードのリスト
+    
+    Returns:
+        {銘柄コード: Future} の辞書（ウォッチリストの順序を保持）
+    """
+    executor = get_batch_executor()
+    return {ticker: executor.submit(analyze_ticker, ticker) for ticker in tickers}
+
+
 def check_and_notify(ticker: str, signal_result: dict):
     """シグナルをチェックして通知を送信"""
     signal_type = signal_result['signal']
     
-    # === 取引時間チェック ===
-    now = datetime.now()
-    is_japanese_stock = ticker.endswith('.T')
-    
-    if is_japanese_stock:
-        # 日本株: 9:00-15:30 のみ通知
-        market_open = now.replace(hour=9, minute=0, second=0, microsecond=0)
-        market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
-        if not (market_open <= now <= market_close):
-            return  # 取引時間外は通知しない
-        # 土日チェック（0=月曜, 6=日曜）
-        if now.weekday() >= 5:
-            return  # 土日は通知しない
+    # 大半を占める「シグナルなし」はここで終了
+    if signal_type == SignalType.NONE:
+        return False
+    
+    # 前回通知と同じシグナルなら再通知しない
+    last_signal, _ = st.session_state.last_notify_state.get(ticker, (None, None))
+    if signal_type == last_signal:
+        return False
+    
+    # === 取引時間チェック（スクリプト実行ごとに1回だけ計算した判定を再利用） ===
+    now, jp_open, us_open = st.session_state.get('_market_gate') or compute_market_gate(get_run_now())
+    
+    if ticker.endswith('.T'):
+        if not jp_open:
+            return False  # 取引時間外・土日は通知しない
     else:
-        # 米国株: 日本時間 23:30-6:00 (サマータイム: 22:30-5:00)
-        # 簡易チェック: 営業日のみ
-        if now.weekday() >= 5:
-            return  # 土日は通知しない
-    
-    # 最後の通知時刻をチェック（クールダウン: 30分）
-    if 'last_notification_time' not in st.session_state:
-        st.session_state.last_notification_time = {}
-    
-    last_signal = st.session_state.last_signals.get(ticker)
-    last_notify_time = st.session_state.last_notification_time.get(ticker)
-    
-    # 30分以内に同じ銘柄で通知していたらスキップ
-    cooldown_minutes = 30
-    if last_notify_time:
-        elapsed = (datetime.now() - last_notify_time).total_seconds() / 60
-        if elapsed < cooldown_minutes and signal_type == last_signal:
-            return  # クールダウン中は通知しない
-    
-    if signal_type != SignalType.NONE and signal_type != last_signal:
-        st.session_state.last_signals[ticker] = signal_type
-        st.session_state.last_notification_time[ticker] = datetime.now()
-        
-        notify_type = "buy" if signal_type == SignalType.LONG else "sell"
-        st.session_state.notification_manager.add_alert(
-            ticker, notify_type, signal_result['current_state']
-        )
-        
-        notifier = get_webhook_notifier()
-        rr = signal_result.get('risk_reward', {})
-        notifier.send_all(
-            ticker=ticker,
-            signal_type=notify_type,
-            message=f"{signal_result['current_state']} - トリガー: {signal_result['trigger']}",
-            entry=rr.get('entry'),
-            stop_loss=rr.get('stop_loss'),
-            take_profit=rr.get('take_profit')
-        )
-        
-        script = get_browser_notification_script(ticker, notify_type, signal_result['current_state'])
-        components.html(script, height=0)
-        
-        return True
-    return False
+        if not us_open:
+            return False  # 土日は通知しない
+    
+    st.session_state.last_notify_state[ticker] = (signal_type, now)
+    
+    notify_type = "buy" if signal_type == SignalType.LONG else "sell"
+    st.session_state.notification_manager.add_alert(
+        ticker, notify_type, signal_result['current_state']
+    )
+    
+    notifier = get_webhook_notifier()
+    rr = signal_result.get('risk_reward', {})
+    notifier.send_all(
+        ticker=ticker,
+        signal_type=notify_type,
+        message=f"{signal_result['current_state']} - トリガー: {signal_result['trigger']}",
+        entry=rr.get('entry'),
+        stop_loss=rr.get('stop_loss'),
+        take_profit=rr.get('take_profit')
+    )
+    
+    script = get_browser_notification_script(ticker, notify_type, signal_result['current_state'])
+    components.html(script, height=0)
+    
+    return True
 
 
-def render_analysis_result(ticker: str, result: dict):
-    """分析結果を表示"""
+def render_analysis_result(ticker: str, result: dict, assets: dict = None):
+    """分析結果を表示（assets: 計算済みの総資産。購入シミュレーターで再利用）"""
     if not result['success']:
         st.error(f"エラーが発生しました: {result['error']}")
         st.info("銘柄コードを確認してください（例: AAPL, NVDA, 7203.T, 9984.T）")
@@ -167,39 +238,16 @@ def render_analysis_result(ticker: str, result: dict):
     # ステータスパネル
     st.subheader(f"📊 {info['name']} ({ticker})")
     
-    current_price = df_main.iloc[-1]['close']
-    prev_price = df_main.iloc[-2]['close']
+    # 直近2本の必要な値を一度だけ取り出す（行ごとのSeries生成を避ける）
+    tail = df_main.reindex(columns=TAIL_COLUMNS, fill_value=0).to_numpy()[-2:]
+    current_price, rsi_value, ema_20, ema_200 = tail[-1]
+    prev_price = tail[-2, 0]
     change_pct = ((current_price - prev_price) / prev_price * 100)
-    rsi_value = df_main.iloc[-1]['rsi']
     
     # テクニカルスコア計算
-    tech_score = 0
-    # トレンド（40点）
-    if df_main.iloc[-1]['close'] > df_main.iloc[-1].get('ema_200', 0):
-        tech_score += 20
-    if df_main.iloc[-1].get('ema_20', 0) > df_main.iloc[-1].get('ema_200', 0):
-        tech_score += 20
-    # モメンタム（40点）
-    if 30 <= rsi_value <= 40:
-        tech_score += 30
-    elif rsi_value < 30:
-        tech_score += 25
-    elif 40 < rsi_value <= 60:
-        tech_score += 20
-    # 出来高（10点デフォルト）
-    tech_score += 10
-    # 価格ボーナス
-    price_bonus = 10 if current_price < 1000 else (5 if current_price < 3000 else 0)
-    base_score = tech_score + price_bonus
-    # ランク判定
-    if base_score >= 80:
-        rank = "S"
-    elif base_score >= 60:
-        rank = "A"
-    elif base_score >= 40:
-        rank = "B"
-    else:
-        rank = "C"
+    scores, ranks = compute_tech_score(current_price, ema_20, ema_200, rsi_value)
+    base_score = int(scores[0])
+    rank = str(ranks[0])
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
@@ -207,7 +255,7 @@ def render_analysis_result(ticker: str, result: dict):
         st.metric("現在価格", f"{current_price:.2f}", delta=f"{change_pct:.2f}%")
     
     with col2:
-        trend_color = "🟢" if "上昇" in signal_result['trend'] else "🔴" if "下落" in signal_result['trend'] else "⚪"
+        trend_color = TREND_ICONS.get(signal_result['trend_direction'], "⚪")
         st.metric("トレンド", trend_color)
         st.caption(signal_result['trend'])
     
@@ -245,7 +293,7 @@ def render_analysis_result(ticker: str, result: dict):
     st.divider()
     rr = signal_result.get('risk_reward', {})
     stop_loss_suggestion = rr.get('stop_loss') if rr else current_price * 0.95
-    render_position_calculator(ticker, current_price, stop_loss_suggestion)
+    render_position_calculator(ticker, current_price, stop_loss_suggestion, assets)
     
     # リスクリワード表示（シグナル時のみ）
     if rr:
@@ -272,10 +320,11 @@ def render_analysis_result(ticker: str, result: dict):
     
     # チャート表示
     st.subheader("📈 チャート")
-    fig = create_candlestick_chart(df_main, ticker)
+    from chart import get_candlestick_chart
+    fig = get_candlestick_chart(df_main, ticker)
     st.plotly_chart(fig, use_container_width=True)
     
-    st.caption(f"最終更新: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    st.caption(f"最終更新: {get_run_now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 
 def render_portfolio_page():
@@ -313,11 +362,9 @@ def render_portfolio_page():
         if ticker_sim:
             ticker_sim = ticker_sim.upper()
             try:
-                import yfinance as yf
-                stock = yf.Ticker(ticker_sim)
-                price = stock.info.get('regularMarketPrice') or stock.info.get('currentPrice')
+                price = get_current_price(ticker_sim)
                 if price:
-                    render_position_calculator(ticker_sim, price)
+                    render_position_calculator(ticker_sim, price, assets=assets)
                 else:
                     st.warning("価格を取得できませんでした")
             except Exception as e:
@@ -329,6 +376,8 @@ def render_portfolio_page():
 
 def main():
     """メイン関数"""
+    # 取引時間の判定はスクリプト実行ごとに1回だけ計算
+    st.session_state._market_gate = compute_market_gate(get_run_now())
     
     # サイドバー - ナビゲーション
     with st.sidebar:
@@ -346,11 +395,14 @@ def main():
         page = "📈 シグナル監視"
     
     # ページ分岐
+    # 各ページのモジュール（plotly等を含む）は表示時にのみ読み込む
     if page == "📚 用語解説":
+        from glossary import render_glossary_page
         render_glossary_page()
         return
     
     if page == "🔍 スクリーナー":
+        from screener import render_screener_page
         render_screener_page()
         return
     
@@ -399,21 +451,19 @@ def main():
                 st.success(f"{ticker_input.upper()} を追加")
                 st.rerun()
         
+        # 銘柄名はループ前にまとめて取得（1時間キャッシュ）
+        display_names = {ticker: get_watchlist_display_name(ticker) for ticker in st.session_state.watchlist}
+        
         for i, ticker in enumerate(st.session_state.watchlist):
             col1, col2 = st.columns([3, 1])
             with col1:
-                # 銘柄名を取得して表示
-                try:
-                    info = get_ticker_info(ticker)
-                    display_name = info.get('name', ticker)[:15]
-                except:
-                    display_name = ticker
+                display_name = display_names[ticker]
                 if st.button(f"{ticker}: {display_name}", key=f"watch_{i}", use_container_width=True):
                     st.session_state.selected_ticker = ticker
             with col2:
                 if st.button("×", key=f"remove_{i}"):
                     from database import remove_from_watchlist
-                    remove_from_watchlist(ticker)
+                    remove_from_watchlist(ticker, index=i)
                     st.rerun()
         
         if st.session_state.watchlist:
@@ -423,6 +473,8 @@ def main():
             
             if st.button("🔄 全銘柄を一括分析", use_container_width=True):
                 st.session_state.batch_analyze = True
+                # サイドバー描画と並行して分析を開始
+                st.session_state.batch_futures = start_batch_analysis(st.session_state.watchlist)
         
         st.divider()
         
@@ -451,24 +503,28 @@ def main():
         if use_ai:
             st.info("🤖 AI分析モードON（Gemini API使用）")
         
-        tabs = st.tabs(st.session_state.watchlist)
-        for tab, ticker in zip(tabs, st.session_state.watchlist):
+        # ボタン押下時に投入済みの分析を受け取る（なければここで投入）
+        futures = st.session_state.pop('batch_futures', None) or start_batch_analysis(st.session_state.watchlist)
+        tickers = list(futures)
+        tabs = st.tabs(tickers)
+        
+        for tab, ticker in zip(tabs, tickers):
             with tab:
                 with st.spinner(f"{ticker} を分析中..."):
-                    result = analyze_ticker(ticker)
-                    render_analysis_result(ticker, result)
-                    
-                    # AI分析（トグルON時のみ）
-                    if use_ai:
-                        try:
-                            from sentiment import render_sentiment_panel
-                            st.divider()
-                            st.markdown("### 🤖 AI感情分析")
-                            render_sentiment_panel(ticker)
-                        except ImportError:
-                            st.warning("AI機能のライブラリがインストールされていません")
-                        except Exception as e:
-                            st.error(f"AI分析エラー: {e}")
+                    result = futures[ticker].result()
+                    render_analysis_result(ticker, result, assets)
+                
+                # AI分析（トグルON時のみ）
+                if use_ai:
+                    try:
+                        from sentiment import render_sentiment_panel
+                        st.divider()
+                        st.markdown("### 🤖 AI感情分析")
+                        render_sentiment_panel(ticker)
+                    except ImportError:
+                        st.warning("AI機能のライブラリがインストールされていません")
+                    except Exception as e:
+                        st.error(f"AI分析エラー: {e}")
     
     elif analyze_button or st.session_state.get('selected_ticker'):
         selected = st.session_state.get('selected_ticker')
@@ -478,7 +534,7 @@ def main():
         
         with st.spinner(f"{ticker} のデータを取得中..."):
             result = analyze_ticker(ticker)
-            render_analysis_result(ticker, result)
+            render_analysis_result(ticker, result, assets)
     
     else:
         # 保有銘柄一覧を表示
@@ -507,3 +563,5 @@ def main():
 
 if __name__ == "__main__":
     main()
+    # この実行中の更新をまとめてファイルに保存
+    flush_pending_writes()
@@ -2,9 +2,136 @@
 チャート生成モジュール
 Plotlyでインタラクティブなローソク足チャートを描画
 """
+import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
+
+
+# ブラウザへ送る最大点数（これを超える場合は間引いて描画）
+MAX_CHART_POINTS = 2000
+
+# 生成済みチャートのキャッシュTTL（秒）
+CHART_CACHE_TTL_SECONDS = 60
+
+
+def _downsample_ohlc(df: pd.DataFrame, n_out: int = MAX_CHART_POINTS) -> pd.DataFrame:
+    """
+    OHLCデータを最大n_out本のバケットに集約（始値=first, 高値=max, 安値=min, 終値=last）
+    
+    Args:
+        df: OHLCデータ
+        n_out: 出力する最大本数
+    
+    Returns:
+        集約後のDataFrame（n_out本以下ならそのまま返す）
+    """
+    if len(df) <= n_out:
+        return df
+    
+    # 市場休場時間の空白ができないよう、時間幅ではなく本数で均等に分割
+    bucket = np.arange(len(df)) * n_out // len(df)
+    grouped = df[['open', 'high', 'low', 'close']].groupby(bucket)
+    df_out = grouped.agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last'
+    })
+    # 各バケット先頭の時刻をインデックスにする
+    df_out.index = df.index[np.searchsorted(bucket, df_out.index)]
+    
+    return df_out
+
+
+def _lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB (Largest-Triangle-Three-Buckets) で残す点のインデックスを求める
+    
+    Args:
+        y: 値の配列（x軸は等間隔の行番号として扱う）
+        n_out: 出力する点数
+    
+    Returns:
+        残す点のインデックス配列
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    x = np.arange(n, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    # 先頭・末尾を除いた点を n_out - 2 個のバケットに分割
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # 次のバケットの平均点（最後のバケットは末尾の点）
+        if i < n_out - 3:
+            next_end = edges[i + 2]
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        
+        # 前の採用点・平均点と作る三角形の面積が最大の点を採用
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev]) -
+            (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        indices[i + 1] = prev
+    
+    return indices
+
+
+def _downsample_line(series: pd.Series, n_out: int = MAX_CHART_POINTS) -> pd.Series:
+    """
+    ライン系列（EMA、RSIなど）をLTTBで間引く
+    
+    Args:
+        series: 描画する系列
+        n_out: 出力する最大点数
+    
+    Returns:
+        間引き後の系列
+    """
+    if len(series) <= n_out:
+        return series
+    return series.iloc[_lttb_indices(series.to_numpy(), n_out)]
+
+
+def _signal_mask(
+    n: int,
+    pin: np.ndarray,
+    pin_value: str,
+    eng: np.ndarray,
+    eng_value: str
+) -> np.ndarray:
+    """
+    ピンバー/包み足の判定結果からシグナル位置のマスクを作成
+    
+    Args:
+        n: 行数
+        pin: pin_bar列の配列（列がなければNone）
+        pin_value: 対象とするピンバーの値
+        eng: engulfing列の配列（列がなければNone）
+        eng_value: 対象とする包み足の値
+    
+    Returns:
+        シグナル位置がTrueのブール配列
+    """
+    mask = np.zeros(n, dtype=bool)
+    if pin is not None:
+        mask |= pin == pin_value
+    if eng is not None:
+        mask |= eng == eng_value
+    return mask
 
 
 def create_candlestick_chart(
@@ -32,109 +159,108 @@ def create_candlestick_chart(
         subplot_titles=(f'{ticker} - ローソク足チャート', 'RSI (14)')
     )
     
-    # ローソク足
-    fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['open'],
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
-            name='OHLC',
-            increasing_line_color='#26a69a',
-            decreasing_line_color='#ef5350'
-        ),
-        row=1, col=1
-    )
+    # 追加するトレースと配置する行（列は常に1）
+    traces = []
+    rows = []
+    
+    # ローソク足（描画点数が多い場合は集約）
+    df_ohlc = _downsample_ohlc(df)
+    traces.append(go.Candlestick(
+        x=df_ohlc.index,
+        open=df_ohlc['open'],
+        high=df_ohlc['high'],
+        low=df_ohlc['low'],
+        close=df_ohlc['close'],
+        name='OHLC',
+        increasing_line_color='#26a69a',
+        decreasing_line_color='#ef5350'
+    ))
+    rows.append(1)
     
     # EMA 20
     if 'ema_20' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['ema_20'],
-                mode='lines',
-                name='EMA 20',
-                line=dict(color='#2196F3', width=1.5)
-            ),
-            row=1, col=1
-        )
+        ema_20 = _downsample_line(df['ema_20'])
+        traces.append(go.Scatter(
+            x=ema_20.index,
+            y=ema_20,
+            mode='lines',
+            name='EMA 20',
+            line=dict(color='#2196F3', width=1.5)
+        ))
+        rows.append(1)
     
     # EMA 200
     if 'ema_200' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['ema_200'],
-                mode='lines',
-                name='EMA 200',
-                line=dict(color='#FF9800', width=2)
-            ),
-            row=1, col=1
-        )
+        ema_200 = _downsample_line(df['ema_200'])
+        traces.append(go.Scatter(
+            x=ema_200.index,
+            y=ema_200,
+            mode='lines',
+            name='EMA 200',
+            line=dict(color='#FF9800', width=2)
+        ))
+        rows.append(1)
     
     # シグナルマーカー
     if show_signals:
+        # パターン列は1回だけnumpy配列として取り出す（列がなければNone）
+        pin = df['pin_bar'].to_numpy() if 'pin_bar' in df.columns else None
+        eng = df['engulfing'].to_numpy() if 'engulfing' in df.columns else None
+        index = df.index.to_numpy()
+        
         # 買いシグナル（下ヒゲピンバー or 陽線包み足）
-        buy_signals = df[
-            (df.get('pin_bar', 'none') == 'bullish_pin') |
-            (df.get('engulfing', 'none') == 'bullish_engulfing')
-        ]
-        if not buy_signals.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=buy_signals.index,
-                    y=buy_signals['low'] * 0.998,
-                    mode='markers',
-                    name='買いシグナル',
-                    marker=dict(
-                        symbol='triangle-up',
-                        size=15,
-                        color='#00E676',
-                        line=dict(width=1, color='white')
-                    ),
-                    hovertemplate='買いシグナル<br>%{x}<extra></extra>'
+        buy_mask = _signal_mask(len(df), pin, 'bullish_pin', eng, 'bullish_engulfing')
+        if buy_mask.any():
+            traces.append(go.Scatter(
+                x=index[buy_mask],
+                y=df['low'].to_numpy()[buy_mask] * 0.998,
+                mode='markers',
+                name='買いシグナル',
+                marker=dict(
+                    symbol='triangle-up',
+                    size=15,
+                    color='#00E676',
+                    line=dict(width=1, color='white')
                 ),
-                row=1, col=1
-            )
+                hovertemplate='買いシグナル<br>%{x}<extra></extra>'
+            ))
+            rows.append(1)
         
         # 売りシグナル（上ヒゲピンバー or 陰線包み足）
-        sell_signals = df[
-            (df.get('pin_bar', 'none') == 'bearish_pin') |
-            (df.get('engulfing', 'none') == 'bearish_engulfing')
-        ]
-        if not sell_signals.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=sell_signals.index,
-                    y=sell_signals['high'] * 1.002,
-                    mode='markers',
-                    name='売りシグナル',
-                    marker=dict(
-                        symbol='triangle-down',
-                        size=15,
-                        color='#FF5252',
-                        line=dict(width=1, color='white')
-                    ),
-                    hovertemplate='売りシグナル<br>%{x}<extra></extra>'
+        sell_mask = _signal_mask(len(df), pin, 'bearish_pin', eng, 'bearish_engulfing')
+        if sell_mask.any():
+            traces.append(go.Scatter(
+                x=index[sell_mask],
+                y=df['high'].to_numpy()[sell_mask] * 1.002,
+                mode='markers',
+                name='売りシグナル',
+                marker=dict(
+                    symbol='triangle-down',
+                    size=15,
+                    color='#FF5252',
+                    line=dict(width=1, color='white')
                 ),
-                row=1, col=1
-            )
+                hovertemplate='売りシグナル<br>%{x}<extra></extra>'
+            ))
+            rows.append(1)
     
     # RSI
     if 'rsi' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['rsi'],
-                mode='lines',
-                name='RSI',
-                line=dict(color='#9C27B0', width=1.5)
-            ),
-            row=2, col=1
-        )
-        
-        # RSI オーバーボート/オーバーソールドライン
+        rsi = _downsample_line(df['rsi'])
+        traces.append(go.Scatter(
+            x=rsi.index,
+            y=rsi,
+            mode='lines',
+            name='RSI',
+            line=dict(color='#9C27B0', width=1.5)
+        ))
+        rows.append(2)
+    
+    # トレースは1回の add_traces でまとめて追加（add_trace毎の再検証を避ける）
+    fig.add_traces(traces, rows=rows, cols=[1] * len(traces))
+    
+    # RSI オーバーボート/オーバーソールドライン
+    if 'rsi' in df.columns:
         fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
         fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
         fig.add_hline(y=50, line_dash="dot", line_color="gray", row=2, col=1)
@@ -160,6 +286,41 @@ def create_candlestick_chart(
     return fig
 
 
+def _chart_frame_key(df: pd.DataFrame) -> tuple:
+    """チャートキャッシュ用のDataFrame識別キー（全体ハッシュを避け最終足で判定）"""
+    if df.empty:
+        return (0, "", 0.0)
+    return (len(df), str(df.index[-1]), float(df['close'].iloc[-1]))
+
+
+@st.cache_resource(
+    ttl=CHART_CACHE_TTL_SECONDS,
+    max_entries=32,
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: _chart_frame_key}
+)
+def get_candlestick_chart(
+    df: pd.DataFrame,
+    ticker: str,
+    show_signals: bool = True
+) -> go.Figure:
+    """
+    ローソク足チャートを取得（キャッシュ付き）
+    
+    (銘柄, 行数・最終足, シグナル表示) が同じなら前回のFigureを再利用する。
+    Figureはpickle往復で再検証が走るため、cache_dataではなくcache_resourceで保持する
+    
+    Args:
+        df: 指標・パターンが追加されたDataFrame
+        ticker: 銘柄コード
+        show_signals: シグナルマーカーを表示するか
+    
+    Returns:
+        Plotly Figure オブジェクト
+    """
+    return create_candlestick_chart(df, ticker, show_signals)
+
+
 def create_simple_chart(df: pd.DataFrame, ticker: str) -> go.Figure:
     """
     シンプルなローソク足チャート（指標なし）
@@ -171,13 +332,14 @@ def create_simple_chart(df: pd.DataFrame, ticker: str) -> go.Figure:
     Returns:
         Plotly Figure
     """
+    df_ohlc = _downsample_ohlc(df)
     fig = go.Figure(data=[
         go.Candlestick(
-            x=df.index,
-            open=df['open'],
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
+            x=df_ohlc.index,
+            open=df_ohlc['open'],
+            high=df_ohlc['high'],
+            low=df_ohlc['low'],
+            close=df_ohlc['close'],
             name='OHLC'
         )
     ])
@@ -5,12 +5,63 @@ yfinanceをキャッシュ付きで使用してAPIコール削減
 import streamlit as st
 import yfinance as yf
 import pandas as pd
+import concurrent.futures
+import os
+import time
+from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Tuple, Optional, Dict
 
 
 # キャッシュのTTL（秒）
 CACHE_TTL_SECONDS = 300  # 5分
+NAME_CACHE_TTL_SECONDS = 3600  # 銘柄名は1時間
+BATCH_INFO_MAX_WORKERS = 10  # 銘柄情報の並列取得数
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# プロセス間で共有するOHLCデータのディスクキャッシュ
+# （yfinance は requests_cache 等のキャッシュ付きセッションを受け付けないため自前で保存）
+DISK_CACHE_DIR = Path(__file__).parent / ".data" / "yf_cache"
+
+
+def _disk_cache_path(ticker: str, interval: str, period: str) -> Path:
+    """ディスクキャッシュのファイルパスを取得"""
+    safe_ticker = ticker.replace("/", "_").replace("^", "_")
+    return DISK_CACHE_DIR / f"{safe_ticker}_{interval}_{period}.pkl"
+
+
+def _load_disk_cache(path: Path) -> Optional[pd.DataFrame]:
+    """TTL内のディスクキャッシュを読み込み（なければNone）"""
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL_SECONDS:
+            return pd.read_pickle(path)
+    except:
+        pass
+    return None
+
+
+def _save_disk_cache(path: Path, df: pd.DataFrame):
+    """ディスクキャッシュに保存（書き込み途中のファイルを読まれないよう置き換えで保存）"""
+    try:
+        DISK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Disk cache save error: {e}")
+
+
+def _normalize_ohlc(df: pd.DataFrame) -> pd.DataFrame:
+    """yfinanceのOHLCデータのカラム名・dtypeを標準化"""
+    # カラム名を標準化
+    df.columns = [col.lower() for col in df.columns]
+    
+    # 価格はfloat32で十分（有効桁約7桁）なため縮小し、メモリとチャート転送量を削減
+    # 出来高は桁あふれしないよう値に応じた最小の整数型に変換
+    df[PRICE_COLUMNS] = df[PRICE_COLUMNS].astype('float32')
+    if 'volume' in df.columns:
+        df['volume'] = pd.to_numeric(df['volume'], downcast='integer')
+    return df
 
 
 @st.cache_data(ttl=CACHE_TTL_SECONDS)
@@ -30,6 +81,12 @@ def fetch_stock_data(
     Returns:
         OHLCデータを含むDataFrame
     """
+    # 他のプロセス（別ワーカー・再起動直後）が取得済みならそれを使う
+    cache_path = _disk_cache_path(ticker, interval, period)
+    cached = _load_disk_cache(cache_path)
+    if cached is not None:
+        return cached
+    
     try:
         stock = yf.Ticker(ticker)
         df = stock.history(period=period, interval=interval)
@@ -37,14 +94,65 @@ def fetch_stock_data(
         if df.empty:
             raise ValueError(f"データが取得できませんでした: {ticker}")
         
-        # カラム名を標準化
-        df.columns = [col.lower() for col in df.columns]
-        
+        df = _normalize_ohlc(df)
+        _save_disk_cache(cache_path, df)
         return df
     except Exception as e:
         raise Exception(f"データ取得エラー ({ticker}): {str(e)}")
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def fetch_stock_data_batch(
+    tickers: tuple,
+    interval: str = "15m",
+    period: str = "5d"
+) -> Dict[str, pd.DataFrame]:
+    """
+    複数銘柄のOHLCデータを一括取得（キャッシュ付き）
+    
+    銘柄ごとに fetch_stock_data を呼ぶ代わりに yf.download で1回のリクエストにまとめる
+    
+    Args:
+        tickers: 銘柄コードのタプル（キャッシュのためタプルを使用）
+        interval: 時間足
+        period: 取得期間
+    
+    Returns:
+        {銘柄コード: OHLCデータ} の辞書（取得できなかった銘柄は含まない）
+    """
+    if not tickers:
+        return {}
+    
+    try:
+        data = yf.download(
+            list(tickers),
+            period=period,
+            interval=interval,
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False
+        )
+    except Exception:
+        return {}
+    
+    frames = {}
+    for ticker in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                df = data[ticker]
+            else:
+                df = data
+            # 他銘柄の取引時間に合わせて入った全列NaNの行を除く
+            df = df.dropna(how='all')
+            if not df.empty:
+                frames[ticker] = _normalize_ohlc(df.copy())
+        except KeyError:
+            continue
+    
+    return frames
+
+
 @st.cache_data(ttl=CACHE_TTL_SECONDS)
 def fetch_multi_timeframe_data(
     ticker: str
@@ -94,82 +202,199 @@ def resample_to_4h(df_1h: pd.DataFrame) -> pd.DataFrame:
     return df_4h
 
 
+INFO_TIMEOUT_SECONDS = 10  # 銘柄情報取得のタイムアウト
+
+
+def _call_with_timeout(func, timeout: float = INFO_TIMEOUT_SECONDS):
+    """
+    関数を別スレッドで実行し、タイムアウトしたら待たずに TimeoutError を送出
+    
+    with文だと終了時にスレッドの完了を待ってしまうため、shutdown(wait=False) で抜ける
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(func).result(timeout=timeout)
+    finally:
+        executor.shutdown(wait=False)
+
+
 @st.cache_data(ttl=CACHE_TTL_SECONDS)
 def get_ticker_info(ticker: str) -> dict:
     """
     銘柄の基本情報を取得（キャッシュ付き、タイムアウト対応）
     
+    価格・通貨・取引所は軽量な fast_info から取得する（.info は約200項目のため重い）
+    
     Args:
         ticker: 銘柄コード
     
     Returns:
         銘柄情報の辞書
     """
-    import concurrent.futures
-    
-    def fetch_info():
-        stock = yf.Ticker(ticker)
-        return stock.info
+    def fetch_fast_info():
+        fi = yf.Ticker(ticker).fast_info
+        return {
+            "currency": fi["currency"],
+            "exchange": fi["exchange"],
+            "last_price": fi["last_price"]
+        }
     
     try:
-        # 10秒タイムアウト
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(fetch_info)
-            info = future.result(timeout=10)
-            
+        fast = _call_with_timeout(fetch_fast_info)
         return {
-            "name": info.get("shortName", ticker),
-            "currency": info.get("currency", "Unknown"),
-            "exchange": info.get("exchange", "Unknown"),
-            "current_price": info.get("regularMarketPrice") or info.get("currentPrice")
+            "name": get_ticker_name(ticker),
+            "currency": fast["currency"] or "Unknown",
+            "exchange": fast["exchange"] or "Unknown",
+            "current_price": fast["last_price"]
         }
-    except concurrent.futures.TimeoutError:
-        return {"name": ticker, "currency": "Unknown", "exchange": "Unknown", "current_price": None}
     except:
         return {"name": ticker, "currency": "Unknown", "exchange": "Unknown", "current_price": None}
 
 
+@st.cache_data(ttl=NAME_CACHE_TTL_SECONDS)
+def get_ticker_name(ticker: str) -> str:
+    """
+    銘柄名を取得（銘柄名はほぼ変わらないため長めにキャッシュ）
+    
+    fast_info には銘柄名がないため、ここだけ .info を使う
+    """
+    try:
+        info = _call_with_timeout(lambda: yf.Ticker(ticker).info)
+        return info.get("shortName", ticker)
+    except:
+        return ticker
+
+
+def get_ticker_names_batch(tickers: tuple) -> Dict[str, str]:
+    """
+    複数銘柄の銘柄名を並列に取得
+    
+    キャッシュは銘柄単位（get_ticker_name）で持つため、未取得の銘柄だけが .info を呼ぶ
+    
+    Args:
+        tickers: 銘柄コードのタプル
+    
+    Returns:
+        {銘柄コード: 銘柄名} の辞書（取得できなかった銘柄は銘柄コードのまま）
+    """
+    if not tickers:
+        return {}
+    
+    # HTTP待ちが支配的なため並列に取得
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_INFO_MAX_WORKERS) as executor:
+        names = list(executor.map(get_ticker_name, tickers))
+    
+    return dict(zip(tickers, names))
+
+
+@st.cache_data(ttl=60)  # 1分キャッシュ
+def get_current_prices_batch(tickers: tuple) -> Dict[str, float]:
+    """
+    複数銘柄の現在価格を一括取得（キャッシュ付き）
+    
+    銘柄ごとに .info を呼ぶ代わりに yf.download で1回のリクエストにまとめる
+    
+    Args:
+        tickers: 銘柄コードのタプル（キャッシュのためタプルを使用）
+    
+    Returns:
+        {銘柄コード: 現在価格} の辞書（取得できなかった銘柄は含まない）
+    """
+    if not tickers:
+        return {}
+    
+    try:
+        data = yf.download(
+            list(tickers),
+            period="5d",
+            interval="1d",
+            group_by='ticker',
+            auto_adjust=False,
+            threads=True,
+            progress=False
+        )
+    except Exception:
+        return {}
+    
+    prices = {}
+    for ticker in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                close = data[ticker]['Close']
+            else:
+                close = data['Close']
+            close = close.dropna()
+            if not close.empty:
+                prices[ticker] = float(close.iloc[-1])
+        except KeyError:
+            continue
+    
+    return prices
+
+
 @st.cache_data(ttl=60)  # 1分キャッシュ
 def get_current_price(ticker: str) -> Optional[float]:
-    """現在価格を取得（キャッシュ付き）"""
+    """現在価格を取得（キャッシュ付き、fast_info使用）"""
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        return info.get('regularMarketPrice') or info.get('currentPrice')
+        return _call_with_timeout(lambda: yf.Ticker(ticker).fast_info["last_price"])
     except:
         return None
 
 
 @st.cache_data(ttl=CACHE_TTL_SECONDS)
+def _fetch_one_info(ticker: str) -> Optional[dict]:
+    """
+    1銘柄分のスクリーナー用データを取得（銘柄単位でキャッシュ）
+    
+    Args:
+        ticker: 銘柄コード
+    
+    Returns:
+        {'ticker', 'name', 'price', 'info'} の辞書（取得失敗時はNone）
+    """
+    try:
+        info = yf.Ticker(ticker).info
+    except:
+        return None
+    
+    price = info.get('regularMarketPrice') or info.get('currentPrice')
+    if not price:
+        return None
+    
+    return {
+        'ticker': ticker,
+        'name': info.get('shortName', ticker),
+        'price': price,
+        'info': info
+    }
+
+
 def get_stock_data_batch(tickers: tuple, max_price: float = 10000) -> Dict:
     """
     複数銘柄のデータを一括取得（スクリーナー用）
     
+    キャッシュは銘柄単位（_fetch_one_info）で持つため、銘柄が1つ増えても
+    取得し直すのはその銘柄だけになる
+    
     Args:
-        tickers: 銘柄コードのタプル（キャッシュのためタプルを使用）
+        tickers: 銘柄コードのタプル
         max_price: 最大株価フィルター
     
     Returns:
         銘柄データの辞書
     """
-    results = {}
-    for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            price = info.get('regularMarketPrice') or info.get('currentPrice')
-            
-            if price and price <= max_price:
-                results[ticker] = {
-                    'ticker': ticker,
-                    'name': info.get('shortName', ticker),
-                    'price': price,
-                    'info': info
-                }
-        except:
-            continue
+    if not tickers:
+        return {}
+    
+    # HTTP待ちが支配的なため並列に取得
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_INFO_MAX_WORKERS) as executor:
+        fetched = list(executor.map(_fetch_one_info, tickers))
     
-    return results
+    return {
+        data['ticker']: data
+        for data in fetched
+        if data and data['price'] <= max_price
+    }
 
 
 def clear_cache():
@@ -7,16 +7,36 @@ import streamlit as st
 from datetime import datetime
 from typing import List, Dict, Optional
 import json
+import logging
 import os
+import socket
+import time
+import atexit
+import contextvars
+import copy
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+
+logger = logging.getLogger(__name__)
+
 
 # ============================================
 # 設定
 # ============================================
 
+@lru_cache(maxsize=1)
 def get_turso_config():
-    """Turso接続情報を取得"""
+    """Turso接続情報を取得（起動中は変わらないためプロセスで1回だけ読み込む）"""
     url = ""
     token = ""
     
@@ -39,6 +59,8 @@ def get_turso_config():
 
 def is_turso_available():
     """Tursoが利用可能かチェック"""
+    if requests is None:
+        return False
     url, token = get_turso_config()
     return bool(url and token)
 
@@ -47,6 +69,110 @@ def is_turso_available():
 # Turso HTTP API
 # ============================================
 
+# HTTP接続プールの最大接続数
+HTTP_POOL_MAXSIZE = 20
+
+# アイドル中の接続をTCP keepaliveで維持する間隔（秒）
+TCP_KEEPALIVE_IDLE_SECONDS = 30
+
+
+def _keepalive_socket_options() -> list:
+    """
+    プール内の接続用のソケットオプションを作成
+    
+    Streamlitの再実行の合間にアイドル切断されないようTCP keepaliveを有効にする
+    （TCP_KEEPIDLE等はOSによって存在しないため、あるものだけ設定）
+    """
+    from urllib3.connection import HTTPConnection
+    
+    options = list(HTTPConnection.default_socket_options)  # TCP_NODELAY
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, TCP_KEEPALIVE_IDLE_SECONDS))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, TCP_KEEPALIVE_IDLE_SECONDS))
+    return options
+
+
+if requests is not None:
+    class _KeepAliveAdapter(HTTPAdapter):
+        """TCP keepaliveを有効にしたHTTPAdapter"""
+        
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs['socket_options'] = _keepalive_socket_options()
+            super().init_poolmanager(*args, **kwargs)
+
+
+@lru_cache(maxsize=1)
+def _get_http_session():
+    """
+    Turso API用の共有requests.Sessionを取得（keep-alive・接続プール付き）
+    
+    TCP/TLSハンドシェイクをリクエスト間で再利用する（初回呼び出し時に生成）
+    """
+    session = requests.Session()
+    adapter = _KeepAliveAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Turso HTTP APIの引数形式への変換（型ごとの変換を辞書引き1回にする）
+_NULL_ARG = {"type": "null"}
+_ARG_ENCODERS = {
+    str: lambda v: {"type": "text", "value": v},
+    int: lambda v: {"type": "integer", "value": str(v)},
+    bool: lambda v: {"type": "integer", "value": str(int(v))},
+    float: lambda v: {"type": "float", "value": str(v)},
+}
+
+
+def _encode_arg(p) -> dict:
+    """Pythonの値を1つTurso HTTP APIの引数形式に変換"""
+    if p is None:
+        return _NULL_ARG
+    encoder = _ARG_ENCODERS.get(type(p))
+    if encoder is not None:
+        return encoder(p)
+    # numpy.float64 などのサブクラス
+    if isinstance(p, int):
+        return _ARG_ENCODERS[int](int(p))
+    if isinstance(p, float):
+        return _ARG_ENCODERS[float](float(p))
+    return {"type": "text", "value": str(p)}
+
+
+def _to_turso_args(params: list) -> list:
+    """Pythonの値をTurso HTTP APIの引数形式に変換"""
+    return [_encode_arg(p) for p in (params or [])]
+
+
+# セル {type, value} の型ごとの変換関数（型判定のif連鎖を辞書引き1回にする）
+_CELL_DECODERS = {
+    "null": lambda cell: None,
+    "integer": lambda cell: int(cell["value"]),
+    "float": lambda cell: float(cell["value"]),
+    "text": itemgetter("value"),
+    "blob": itemgetter("value"),
+}
+
+
+def _raw_cell_value(cell: dict):
+    """未知の型のセルは値をそのまま返す"""
+    return cell.get("value")
+
+
+def _decode_rows(rows: list) -> List[tuple]:
+    """Turso APIの行データをタプルのリストに変換（ループ内の属性参照をローカル変数に束縛）"""
+    get_decoder = _CELL_DECODERS.get
+    raw = _raw_cell_value
+    extracted = []
+    append = extracted.append
+    for row in rows:
+        append(tuple([get_decoder(cell.get("type"), raw)(cell) for cell in row]))
+    return extracted
+
+
 class TursoConnection:
     """Turso HTTP API接続クラス"""
     
@@ -57,43 +183,84 @@ class TursoConnection:
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
+        self.session = _get_http_session()
     
-    def execute(self, sql: str, params: list = None) -> dict:
-        """SQLを実行"""
-        import requests
-        
-        args = []
-        for p in (params or []):
-            if p is None:
-                args.append({"type": "null"})
-            elif isinstance(p, str):
-                args.append({"type": "text", "value": p})
-            elif isinstance(p, int):
-                args.append({"type": "integer", "value": str(p)})
-            elif isinstance(p, float):
-                args.append({"type": "float", "value": str(p)})
-            else:
-                args.append({"type": "text", "value": str(p)})
-        
-        request_body = {
-            "requests": [
-                {"type": "execute", "stmt": {"sql": sql, "args": args}},
-                {"type": "close"}
-            ]
-        }
-        
-        response = requests.post(
+    def _pipeline(self, requests_list: list) -> dict:
+        """/v2/pipeline にリクエストを送信"""
+        response = self.session.post(
             f"{self.base_url}/v2/pipeline",
             headers=self.headers,
-            json=request_body,
+            json={"requests": requests_list + [{"type": "close"}]},
             timeout=30
         )
         
+        if response.status_code in (401, 403):
+            # トークン失効時は次回の呼び出しで接続情報を読み直す
+            invalidate_connection()
         if response.status_code != 200:
             raise Exception(f"Turso API Error: {response.status_code}")
         
         return response.json()
     
+    def execute(self, sql: str, params: list = None) -> dict:
+        """SQLを実行"""
+        return self._pipeline([
+            {"type": "execute", "stmt": {"sql": sql, "args": _to_turso_args(params)}}
+        ])
+    
+    def execute_many(self, statements: list) -> dict:
+        """
+        複数のSQLを1回のリクエストでまとめて実行
+        
+        Args:
+            statements: (sql, params) のタプルのリスト
+        
+        Returns:
+            APIレスポンス（results は文ごとの結果）
+        """
+        return self._pipeline([
+            {"type": "execute", "stmt": {"sql": sql, "args": _to_turso_args(params)}}
+            for sql, params in statements
+        ])
+    
+    def transaction(self, statements: list) -> list:
+        """
+        複数のSQLを1回のリクエストでトランザクションとして実行
+        
+        BEGIN → 各SQL → COMMIT をバッチで送り、途中で失敗した場合はROLLBACKする
+        
+        Args:
+            statements: (sql, params) のタプルのリスト
+        
+        Returns:
+            SQLごとの実行結果のリスト
+        """
+        steps = [{"stmt": {"sql": "BEGIN"}}]
+        for sql, params in statements:
+            steps.append({
+                "stmt": {"sql": sql, "args": _to_turso_args(params)},
+                "condition": {"type": "ok", "step": len(steps) - 1}
+            })
+        commit_step = len(steps)
+        steps.append({"stmt": {"sql": "COMMIT"}, "condition": {"type": "ok", "step": commit_step - 1}})
+        steps.append({
+            "stmt": {"sql": "ROLLBACK"},
+            "condition": {"type": "not", "cond": {"type": "ok", "step": commit_step}}
+        })
+        
+        result = self._pipeline([{"type": "batch", "batch": {"steps": steps}}])
+        
+        batch_result = result["results"][0]
+        if batch_result.get("type") != "ok":
+            raise Exception(f"Turso batch error: {batch_result.get('error')}")
+        
+        batch_data = batch_result["response"]["result"]
+        errors = [e for e in batch_data.get("step_errors", []) if e]
+        if errors:
+            raise Exception(f"Turso transaction error: {errors[0].get('message')}")
+        
+        return batch_data["step_results"][1:commit_step]
+    
     def fetchall(self, sql: str, params: list = None) -> List[tuple]:
         """SELECT結果を取得"""
         result = self.execute(sql, params)
@@ -107,26 +274,116 @@ class TursoConnection:
                     result_data = response_data.get("result", {})
                     rows = result_data.get("rows", [])
                     
-                    extracted = []
-                    for row in rows:
-                        values = []
-                        for cell in row:
-                            if cell.get("type") == "null":
-                                values.append(None)
-                            elif cell.get("type") == "integer":
-                                values.append(int(cell.get("value")))
-                            elif cell.get("type") == "float":
-                                values.append(float(cell.get("value")))
-                            else:
-                                values.append(cell.get("value"))
-                        extracted.append(tuple(values))
-                    return extracted
+                    return _decode_rows(rows)
         except Exception as e:
-            print(f"Parse error: {e}")
+            logger.debug("Parse error: %s", e)
         
         return []
 
 
+@lru_cache(maxsize=1)
+def get_connection() -> TursoConnection:
+    """
+    Turso接続を取得（プロセス内で1つを使い回す）
+    
+    接続情報は起動中に変わらず、HTTPセッションも共有のため毎回生成する必要はない
+    """
+    return TursoConnection()
+
+
+def invalidate_connection():
+    """キャッシュしたTurso接続と接続情報を破棄（認証エラー時やトークン更新時に使用）"""
+    get_turso_config.cache_clear()
+    get_connection.cache_clear()
+
+
+# Turso読み取り結果のセッション内キャッシュの有効期間（秒）
+# 自セッションの書き込みでは即時破棄し、他セッションの更新はこの期間で反映する
+READ_CACHE_TTL_SECONDS = 30
+
+
+def _cached_fetchall(table: str, sql: str, params: list = None) -> List[tuple]:
+    """
+    SELECT結果をセッション内でキャッシュして取得
+    
+    Streamlitはウィジェット操作のたびにスクリプト全体を再実行するため、
+    同じSELECTが何度も発行されるのを防ぐ
+    
+    Args:
+        table: 参照するテーブル名（書き込み時の破棄単位）
+        sql: SQL文
+        params: パラメータ
+    
+    Returns:
+        行のタプルのリスト
+    """
+    cache = st.session_state.setdefault('_turso_read_cache', {})
+    table_cache = cache.setdefault(table, {})
+    key = (sql, tuple(params or ()))
+    now = time.monotonic()
+    
+    hit = table_cache.get(key)
+    if hit is not None and now - hit[0] < READ_CACHE_TTL_SECONDS:
+        return hit[1]
+    
+    rows = get_connection().fetchall(sql, params)
+    table_cache[key] = (now, rows)
+    return rows
+
+
+def _invalidate_reads(table: str):
+    """指定テーブルの読み取りキャッシュを破棄（書き込み時に呼ぶ）"""
+    st.session_state.get('_turso_read_cache', {}).pop(table, None)
+
+
+# ============================================
+# SQL文
+# ============================================
+
+# テーブル作成・初期データ
+CREATE_FUNDS_SQL = "CREATE TABLE IF NOT EXISTS funds (id INTEGER PRIMARY KEY, currency TEXT UNIQUE, amount REAL DEFAULT 0)"
+CREATE_PORTFOLIO_SQL = "CREATE TABLE IF NOT EXISTS portfolio (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE, quantity INTEGER DEFAULT 0, avg_cost REAL DEFAULT 0, stop_loss REAL, currency TEXT DEFAULT 'JPY', created_at TEXT, updated_at TEXT)"
+CREATE_WATCHLIST_SQL = "CREATE TABLE IF NOT EXISTS watchlist (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE)"
+CREATE_SENTIMENT_CACHE_SQL = "CREATE TABLE IF NOT EXISTS sentiment_cache (ticker TEXT, date TEXT, score INTEGER, summary TEXT, updated_at TEXT, PRIMARY KEY (ticker, date))"
+SEED_FUNDS_SQL = "INSERT OR IGNORE INTO funds (currency, amount) VALUES (?, 0)"
+
+# 資金
+GET_FUNDS_SQL = "SELECT currency, amount FROM funds"
+UPDATE_FUNDS_SQL = "UPDATE funds SET amount = ? WHERE currency = ?"
+
+# ポートフォリオ
+GET_PORTFOLIO_SQL = "SELECT id, ticker, quantity, avg_cost, stop_loss, currency, created_at FROM portfolio WHERE quantity > 0"
+GET_HOLDING_SQL = "SELECT id, ticker, quantity, avg_cost, stop_loss, currency FROM portfolio WHERE ticker = ?"
+UPDATE_STOP_LOSS_SQL = "UPDATE portfolio SET stop_loss = ?, updated_at = ? WHERE ticker = ?"
+SELL_HOLDING_SQL = "UPDATE portfolio SET quantity = MAX(0, quantity - ?), updated_at = ? WHERE ticker = ?"
+DELETE_SOLD_OUT_SQL = "DELETE FROM portfolio WHERE ticker = ? AND quantity <= 0"
+DELETE_HOLDING_SQL = "DELETE FROM portfolio WHERE ticker = ?"
+
+# 保有銘柄の追加・買い増し（既存行があれば加重平均で取得単価を更新）
+UPSERT_HOLDING_SQL = """
+    INSERT INTO portfolio (ticker, quantity, avg_cost, stop_loss, currency, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(ticker) DO UPDATE SET
+        avg_cost = CASE WHEN portfolio.quantity + excluded.quantity > 0
+            THEN (portfolio.quantity * portfolio.avg_cost + excluded.quantity * excluded.avg_cost)
+                 / (portfolio.quantity + excluded.quantity)
+            ELSE excluded.avg_cost END,
+        quantity = portfolio.quantity + excluded.quantity,
+        stop_loss = COALESCE(excluded.stop_loss, portfolio.stop_loss),
+        updated_at = excluded.updated_at
+"""
+
+# ウォッチリスト
+GET_WATCHLIST_SQL = "SELECT ticker FROM watchlist"
+ADD_WATCHLIST_SQL = "INSERT OR IGNORE INTO watchlist (ticker) VALUES (?)"
+REMOVE_WATCHLIST_SQL = "DELETE FROM watchlist WHERE ticker = ?"
+
+# 感情スコアキャッシュ
+GET_SENTIMENT_SQL = "SELECT score, summary FROM sentiment_cache WHERE ticker = ? AND date = ?"
+UPSERT_SENTIMENT_SQL = "INSERT OR REPLACE INTO sentiment_cache (ticker, date, score, summary, updated_at) VALUES (?, ?, ?, ?, ?)"
+CLEAR_SENTIMENT_SQL = "DELETE FROM sentiment_cache"
+
+
 # ============================================
 # ローカルJSON永続化
 # ============================================
@@ -143,7 +400,12 @@ def ensure_data_dir():
 
 
 def load_json_file(filepath: Path, default):
-    """JSONファイルを読み込み"""
+    """JSONファイルを読み込み（書き込み待ちのデータがあればそれを返す）"""
+    with _PENDING_LOCK:
+        if filepath in _PENDING_WRITES:
+            # 書き込み待ちのデータは保存を予約したセッションのsession_stateそのものなので、
+            # 別セッションと同じオブジェクトを共有しないようコピーを返す
+            return copy.deepcopy(_PENDING_WRITES[filepath])
     try:
         if filepath.exists():
             with open(filepath, 'r', encoding='utf-8') as f:
@@ -153,22 +415,132 @@ def load_json_file(filepath: Path, default):
     return default
 
 
-def save_json_file(filepath: Path, data):
-    """JSONファイルに保存"""
+def save_json_file(filepath: Path, data, pretty: bool = False):
+    """
+    JSONファイルに保存
+    
+    一時ファイルに書き出してから置き換えるため、書き込み途中で中断しても
+    既存のファイルが壊れない
+    
+    Args:
+        filepath: 保存先
+        data: 保存するデータ
+        pretty: Trueならインデント付きで保存（デバッグ用。通常は機械が読むだけなので圧縮形式）
+    """
     ensure_data_dir()
+    tmp_path = filepath.with_suffix('.tmp')
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except:
-        pass
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if pretty:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            else:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, filepath)
+    except Exception as e:
+        logger.warning("JSON save error (%s): %s", filepath.name, e)
+
+
+# 書き込み待ちのJSONデータ {ファイルパス: データ}
+# Streamlitは1回の操作でスクリプトを何度も再実行するため、更新のたびに書かず
+# スクリプト実行の終わり（またはプロセス終了時）にまとめて1回だけ書き出す
+_PENDING_WRITES: Dict[Path, object] = {}
+_PENDING_LOCK = threading.Lock()
+
+
+def schedule_json_save(filepath: Path, data):
+    """JSONファイルへの保存を予約（flush_pending_writesでまとめて書き出す）"""
+    with _PENDING_LOCK:
+        _PENDING_WRITES[filepath] = data
+
+
+def flush_pending_writes():
+    """予約されたJSON保存をまとめて書き出す"""
+    with _PENDING_LOCK:
+        pending = list(_PENDING_WRITES.items())
+        _PENDING_WRITES.clear()
+    for filepath, data in pending:
+        save_json_file(filepath, data)
+
+
+atexit.register(flush_pending_writes)
 
 
 # ============================================
 # 初期化
 # ============================================
 
+# frozen_time() 中に使う固定時刻（ISO形式文字列）
+# Streamlitは各セッションを別スレッドで実行するため、スレッドごとに独立した値として持つ
+_FROZEN_NOW_ISO: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    '_FROZEN_NOW_ISO', default=None
+)
+
+
+@contextmanager
+def frozen_time():
+    """
+    ブロック内の更新時刻を1つの値に固定する（一括登録用）
+    
+    app.py外（定期タスク等）で_run_nowがない場合も、まとめた更新の時刻を揃えて
+    datetime.now()の呼び出しと整形を1回にする
+    """
+    frozen = _FROZEN_NOW_ISO.get() or datetime.now().isoformat()
+    token = _FROZEN_NOW_ISO.set(frozen)
+    try:
+        yield frozen
+    finally:
+        _FROZEN_NOW_ISO.reset(token)
+
+
+def _now_iso() -> str:
+    """
+    現在時刻のISO形式文字列を取得
+    
+    frozen_time() 中はその固定時刻を返す。
+    app.pyがスクリプト実行ごとに記録する時刻（_run_now）があれば、
+    同じ実行内の更新は1回だけ整形した同じ文字列を使い回す
+    """
+    frozen = _FROZEN_NOW_ISO.get()
+    if frozen is not None:
+        return frozen
+    
+    run_now = st.session_state.get('_run_now')
+    if run_now is None:
+        return datetime.now().isoformat()
+    
+    cached = st.session_state.get('_run_now_iso')
+    if cached is None or cached[0] is not run_now:
+        cached = (run_now, run_now.isoformat())
+        st.session_state._run_now_iso = cached
+    return cached[1]
+
+
+@st.cache_resource(show_spinner=False)
+def _ensure_turso_schema() -> bool:
+    """
+    Tursoのテーブルと初期データを作成
+    
+    スキーマはセッション間で共通なので、cache_resourceでプロセスにつき1回だけ実行する
+    （並行セッションからの同時呼び出しもcache_resource側で1回にまとめられる）
+    """
+    get_connection().execute_many([
+        (CREATE_FUNDS_SQL, None),
+        (CREATE_PORTFOLIO_SQL, None),
+        (CREATE_WATCHLIST_SQL, None),
+        (CREATE_SENTIMENT_CACHE_SQL, None),
+        (SEED_FUNDS_SQL, ['JPY']),
+        (SEED_FUNDS_SQL, ['USD']),
+    ])
+    return True
+
+
 def init_database():
-    """データベースを初期化"""
+    """
+    データベースを初期化
+    
+    各getter/setterから毎回呼ばれるため、初期化済みなら1回の判定だけで戻る。
+    セッションごとのデータ読み込みはsession_stateで、テーブル作成はプロセス単位で管理する
+    """
     if 'db_initialized' in st.session_state:
         return
     
@@ -177,19 +549,15 @@ def init_database():
     if is_turso_available():
         # Tursoで初期化
         try:
-            conn = TursoConnection()
-            conn.execute("CREATE TABLE IF NOT EXISTS funds (id INTEGER PRIMARY KEY, currency TEXT UNIQUE, amount REAL DEFAULT 0)")
-            conn.execute("CREATE TABLE IF NOT EXISTS portfolio (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE, quantity INTEGER DEFAULT 0, avg_cost REAL DEFAULT 0, stop_loss REAL, currency TEXT DEFAULT 'JPY', created_at TEXT, updated_at TEXT)")
-            conn.execute("CREATE TABLE IF NOT EXISTS watchlist (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE)")
-            conn.execute("INSERT OR IGNORE INTO funds (currency, amount) VALUES ('JPY', 0)")
-            conn.execute("INSERT OR IGNORE INTO funds (currency, amount) VALUES ('USD', 0)")
+            _ensure_turso_schema()
+            conn = get_connection()
             # ウォッチリストを読み込み
-            rows = conn.fetchall("SELECT ticker FROM watchlist")
+            rows = conn.fetchall(GET_WATCHLIST_SQL)
             st.session_state.watchlist = [row[0] for row in rows]
             st.session_state.use_turso = True
-            print("Using Turso database")
-        except Exception as e:
-            print(f"Turso init failed: {e}")
+            logger.info("Using Turso database")
+        except Exception:
+            logger.exception("Turso init failed")
             st.session_state.use_turso = False
     else:
         # ローカルJSON
@@ -197,8 +565,9 @@ def init_database():
         ensure_data_dir()
         st.session_state.funds = load_json_file(FUNDS_FILE, {'JPY': 0.0, 'USD': 0.0})
         st.session_state.portfolio = load_json_file(PORTFOLIO_FILE, [])
+        _rebuild_portfolio_index()
         st.session_state.watchlist = load_json_file(WATCHLIST_FILE, [])
-        print("Using local JSON storage")
+        logger.info("Using local JSON storage")
     
     if 'transactions' not in st.session_state:
         st.session_state.transactions = []
@@ -224,8 +593,7 @@ def get_funds() -> Dict[str, float]:
     
     if st.session_state.get('use_turso'):
         try:
-            conn = TursoConnection()
-            rows = conn.fetchall("SELECT currency, amount FROM funds")
+            rows = _cached_fetchall('funds', GET_FUNDS_SQL)
             return {row[0]: row[1] for row in rows}
         except:
             return {'JPY': 0.0, 'USD': 0.0}
@@ -238,28 +606,42 @@ def update_funds(currency: str, amount: float):
     init_database()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('funds')
         try:
-            conn = TursoConnection()
-            conn.execute("UPDATE funds SET amount = ? WHERE currency = ?", [amount, currency])
+            conn = get_connection()
+            conn.execute(UPDATE_FUNDS_SQL, [amount, currency])
         except:
             pass
     else:
         st.session_state.funds[currency] = amount
-        save_json_file(FUNDS_FILE, st.session_state.funds)
+        schedule_json_save(FUNDS_FILE, st.session_state.funds)
 
 
 # ============================================
 # ポートフォリオ管理
 # ============================================
 
+def _rebuild_portfolio_index():
+    """ローカル保存用の {銘柄コード: portfolio内の位置} 索引を作り直す"""
+    st.session_state.portfolio_idx = {
+        h['ticker']: i for i, h in enumerate(st.session_state.get('portfolio', []))
+    }
+
+
+def _find_holding_index(ticker: str) -> Optional[int]:
+    """ローカル保存のportfolio内での位置を索引から取得（なければNone）"""
+    if 'portfolio_idx' not in st.session_state:
+        _rebuild_portfolio_index()
+    return st.session_state.portfolio_idx.get(ticker)
+
+
 def get_portfolio() -> List[Dict]:
     """ポートフォリオ一覧を取得"""
     init_database()
     
     if st.session_state.get('use_turso'):
         try:
-            conn = TursoConnection()
-            rows = conn.fetchall("SELECT id, ticker, quantity, avg_cost, stop_loss, currency, created_at FROM portfolio WHERE quantity > 0")
+            rows = _cached_fetchall('portfolio', GET_PORTFOLIO_SQL)
             columns = ['id', 'ticker', 'quantity', 'avg_cost', 'stop_loss', 'currency', 'created_at']
             return [dict(zip(columns, row)) for row in rows]
         except:
@@ -274,8 +656,7 @@ def get_holding(ticker: str) -> Optional[Dict]:
     
     if st.session_state.get('use_turso'):
         try:
-            conn = TursoConnection()
-            rows = conn.fetchall("SELECT id, ticker, quantity, avg_cost, stop_loss, currency FROM portfolio WHERE ticker = ?", [ticker])
+            rows = _cached_fetchall('portfolio', GET_HOLDING_SQL, [ticker])
             if rows:
                 columns = ['id', 'ticker', 'quantity', 'avg_cost', 'stop_loss', 'currency']
                 return dict(zip(columns, rows[0]))
@@ -283,121 +664,143 @@ def get_holding(ticker: str) -> Optional[Dict]:
             pass
         return None
     else:
-        for h in st.session_state.get('portfolio', []):
-            if h['ticker'] == ticker:
-                return h.copy()
-        return None
+        i = _find_holding_index(ticker)
+        return st.session_state.portfolio[i].copy() if i is not None else None
 
 
 def add_or_update_holding(ticker: str, quantity: int, avg_cost: float, stop_loss: Optional[float] = None, currency: str = "JPY"):
     """保有銘柄を追加または更新"""
+    bulk_add_or_update_holdings([{
+        'ticker': ticker,
+        'quantity': quantity,
+        'avg_cost': avg_cost,
+        'stop_loss': stop_loss,
+        'currency': currency
+    }])
+
+
+def bulk_add_or_update_holdings(holdings: List[Dict]):
+    """
+    複数の保有銘柄をまとめて追加または更新（ポートフォリオの一括登録用）
+    
+    Tursoでは全件を1回のトランザクションで送信し、ローカルでは保存を1回にまとめる
+    
+    Args:
+        holdings: {'ticker', 'quantity', 'avg_cost', 'stop_loss'(任意), 'currency'(任意)} の辞書のリスト
+    """
     init_database()
-    now = datetime.now().isoformat()
+    if not holdings:
+        return
+    now = _now_iso()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('portfolio')
         try:
-            conn = TursoConnection()
-            existing = get_holding(ticker)
-            
-            if existing:
-                total = existing['quantity'] + quantity
-                new_avg = ((existing['quantity'] * existing['avg_cost']) + (quantity * avg_cost)) / total if total > 0 else avg_cost
-                sl = stop_loss or existing.get('stop_loss')
-                conn.execute("UPDATE portfolio SET quantity = ?, avg_cost = ?, stop_loss = ?, updated_at = ? WHERE ticker = ?",
-                           [total, new_avg, sl, now, ticker])
-            else:
-                conn.execute("INSERT INTO portfolio (ticker, quantity, avg_cost, stop_loss, currency, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                           [ticker, quantity, avg_cost, stop_loss, currency, now, now])
-        except:
-            pass
+            conn = get_connection()
+            # 既存行の読み出しと更新をUPSERTにまとめ、全件を1往復・アトミックに実行
+            conn.transaction([
+                (UPSERT_HOLDING_SQL, [
+                    h['ticker'], h['quantity'], h['avg_cost'],
+                    h.get('stop_loss') or None, h.get('currency', 'JPY'), now, now
+                ])
+                for h in holdings
+            ])
+        except Exception:
+            logger.exception("Turso holding update error")
     else:
         portfolio = st.session_state.get('portfolio', [])
-        existing_idx = None
-        for i, h in enumerate(portfolio):
-            if h['ticker'] == ticker:
-                existing_idx = i
-                break
-        
-        if existing_idx is not None:
-            h = portfolio[existing_idx]
-            total = h['quantity'] + quantity
-            new_avg = ((h['quantity'] * h['avg_cost']) + (quantity * avg_cost)) / total if total > 0 else avg_cost
-            portfolio[existing_idx] = {
-                'id': h.get('id', existing_idx),
-                'ticker': ticker,
-                'quantity': total,
-                'avg_cost': new_avg,
-                'stop_loss': stop_loss or h.get('stop_loss'),
-                'currency': currency,
-                'created_at': h.get('created_at'),
-                'updated_at': now
-            }
-        else:
-            portfolio.append({
-                'id': len(portfolio) + 1,
-                'ticker': ticker,
-                'quantity': quantity,
-                'avg_cost': avg_cost,
-                'stop_loss': stop_loss,
-                'currency': currency,
-                'created_at': now,
-                'updated_at': now
-            })
+        for item in holdings:
+            ticker = item['ticker']
+            quantity = item['quantity']
+            avg_cost = item['avg_cost']
+            stop_loss = item.get('stop_loss')
+            currency = item.get('currency', 'JPY')
+            existing_idx = _find_holding_index(ticker)
+            
+            if existing_idx is not None:
+                h = portfolio[existing_idx]
+                total = h['quantity'] + quantity
+                new_avg = ((h['quantity'] * h['avg_cost']) + (quantity * avg_cost)) / total if total > 0 else avg_cost
+                portfolio[existing_idx] = {
+                    'id': h.get('id', existing_idx),
+                    'ticker': ticker,
+                    'quantity': total,
+                    'avg_cost': new_avg,
+                    'stop_loss': stop_loss or h.get('stop_loss'),
+                    'currency': currency,
+                    'created_at': h.get('created_at'),
+                    'updated_at': now
+                }
+            else:
+                portfolio.append({
+                    'id': len(portfolio) + 1,
+                    'ticker': ticker,
+                    'quantity': quantity,
+                    'avg_cost': avg_cost,
+                    'stop_loss': stop_loss,
+                    'currency': currency,
+                    'created_at': now,
+                    'updated_at': now
+                })
+                st.session_state.portfolio_idx[ticker] = len(portfolio) - 1
         
         st.session_state.portfolio = portfolio
-        save_json_file(PORTFOLIO_FILE, portfolio)
+        schedule_json_save(PORTFOLIO_FILE, portfolio)
 
 
 def update_stop_loss(ticker: str, stop_loss: float):
     """損切り価格を更新"""
     init_database()
-    now = datetime.now().isoformat()
+    now = _now_iso()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('portfolio')
         try:
-            conn = TursoConnection()
-            conn.execute("UPDATE portfolio SET stop_loss = ?, updated_at = ? WHERE ticker = ?", [stop_loss, now, ticker])
+            conn = get_connection()
+            conn.execute(UPDATE_STOP_LOSS_SQL, [stop_loss, now, ticker])
         except:
             pass
     else:
-        for h in st.session_state.get('portfolio', []):
-            if h['ticker'] == ticker:
-                h['stop_loss'] = stop_loss
-                h['updated_at'] = now
-                break
-        save_json_file(PORTFOLIO_FILE, st.session_state.portfolio)
+        i = _find_holding_index(ticker)
+        if i is not None:
+            h = st.session_state.portfolio[i]
+            h['stop_loss'] = stop_loss
+            h['updated_at'] = now
+        schedule_json_save(PORTFOLIO_FILE, st.session_state.portfolio)
 
 
 def sell_holding(ticker: str, quantity: int):
     """保有銘柄を売却"""
     init_database()
-    now = datetime.now().isoformat()
+    now = _now_iso()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('portfolio')
         try:
-            conn = TursoConnection()
-            existing = get_holding(ticker)
-            if existing:
-                new_qty = max(0, existing['quantity'] - quantity)
-                if new_qty == 0:
-                    conn.execute("DELETE FROM portfolio WHERE ticker = ?", [ticker])
-                else:
-                    conn.execute("UPDATE portfolio SET quantity = ?, updated_at = ? WHERE ticker = ?", [new_qty, now, ticker])
-        except:
-            pass
+            conn = get_connection()
+            # 数量の減算と売り切り時の削除を1往復で実行
+            conn.transaction([
+                (SELL_HOLDING_SQL, [quantity, now, ticker]),
+                (DELETE_SOLD_OUT_SQL, [ticker]),
+            ])
+        except Exception:
+            logger.exception("Turso sell error")
     else:
         portfolio = st.session_state.get('portfolio', [])
-        for i, h in enumerate(portfolio):
-            if h['ticker'] == ticker:
-                new_qty = max(0, h['quantity'] - quantity)
-                if new_qty == 0:
-                    portfolio.pop(i)
-                else:
-                    h['quantity'] = new_qty
-                    h['updated_at'] = now
-                break
+        i = _find_holding_index(ticker)
+        if i is not None:
+            h = portfolio[i]
+            new_qty = max(0, h['quantity'] - quantity)
+            if new_qty == 0:
+                portfolio.pop(i)
+                # 後ろの銘柄の位置がずれるため索引を作り直す
+                st.session_state.portfolio = portfolio
+                _rebuild_portfolio_index()
+            else:
+                h['quantity'] = new_qty
+                h['updated_at'] = now
         st.session_state.portfolio = portfolio
-        save_json_file(PORTFOLIO_FILE, portfolio)
+        schedule_json_save(PORTFOLIO_FILE, portfolio)
 
 
 def delete_holding(ticker: str):
@@ -405,14 +808,16 @@ def delete_holding(ticker: str):
     init_database()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('portfolio')
         try:
-            conn = TursoConnection()
-            conn.execute("DELETE FROM portfolio WHERE ticker = ?", [ticker])
+            conn = get_connection()
+            conn.execute(DELETE_HOLDING_SQL, [ticker])
         except:
             pass
     else:
         st.session_state.portfolio = [h for h in st.session_state.get('portfolio', []) if h['ticker'] != ticker]
-        save_json_file(PORTFOLIO_FILE, st.session_state.portfolio)
+        _rebuild_portfolio_index()
+        schedule_json_save(PORTFOLIO_FILE, st.session_state.portfolio)
 
 
 # ============================================
@@ -434,54 +839,76 @@ def add_to_watchlist(ticker: str):
         st.session_state.watchlist.append(ticker)
         if st.session_state.get('use_turso'):
             try:
-                conn = TursoConnection()
-                conn.execute("INSERT OR IGNORE INTO watchlist (ticker) VALUES (?)", [ticker])
+                conn = get_connection()
+                conn.execute(ADD_WATCHLIST_SQL, [ticker])
             except:
                 pass
         else:
-            save_json_file(WATCHLIST_FILE, st.session_state.watchlist)
+            schedule_json_save(WATCHLIST_FILE, st.session_state.watchlist)
 
 
-def remove_from_watchlist(ticker: str):
-    """ウォッチリストから削除"""
+def remove_from_watchlist(ticker: str, index: Optional[int] = None):
+    """
+    ウォッチリストから削除
+    
+    Args:
+        ticker: 銘柄コード
+        index: ウォッチリスト内の位置（分かっている場合は値の探索を省略）
+    """
     init_database()
-    if ticker in st.session_state.get('watchlist', []):
-        st.session_state.watchlist.remove(ticker)
+    watchlist = st.session_state.get('watchlist', [])
+    if index is None or not (0 <= index < len(watchlist)) or watchlist[index] != ticker:
+        index = watchlist.index(ticker) if ticker in watchlist else None
+    if index is not None:
+        watchlist.pop(index)
         if st.session_state.get('use_turso'):
             try:
-                conn = TursoConnection()
-                conn.execute("DELETE FROM watchlist WHERE ticker = ?", [ticker])
+                conn = get_connection()
+                conn.execute(REMOVE_WATCHLIST_SQL, [ticker])
             except:
                 pass
         else:
-            save_json_file(WATCHLIST_FILE, st.session_state.watchlist)
+            schedule_json_save(WATCHLIST_FILE, st.session_state.watchlist)
 
 
 # ============================================
 # 取引履歴（セッションのみ）
 # ============================================
 
+# セッション内に保持する取引履歴の最大件数（古いものから破棄）
+MAX_TRANSACTION_HISTORY = 500
+
+
 def add_transaction(ticker: str, action: str, quantity: int, price: float):
     """取引履歴を追加"""
     init_database()
     if 'transactions' not in st.session_state:
         st.session_state.transactions = []
-    st.session_state.transactions.append({
-        'id': len(st.session_state.transactions) + 1,
+    txns = st.session_state.transactions
+    txns.append({
+        'id': txns[-1]['id'] + 1 if txns else 1,
         'ticker': ticker,
         'action': action,
         'quantity': quantity,
         'price': price,
         'total_amount': quantity * price,
-        'executed_at': datetime.now().isoformat()
+        'executed_at': _now_iso()
     })
+    if len(txns) > MAX_TRANSACTION_HISTORY:
+        del txns[:-MAX_TRANSACTION_HISTORY]
 
 
 def get_transactions(limit: int = 20) -> List[Dict]:
-    """取引履歴を取得"""
+    """
+    取引履歴を取得（新しい順）
+    
+    履歴は実行時刻順に追加されるため、ソートせず末尾から取り出す
+    """
     init_database()
+    if limit <= 0:
+        return []
     txns = st.session_state.get('transactions', [])
-    return sorted(txns, key=lambda x: x['executed_at'], reverse=True)[:limit]
+    return txns[-limit:][::-1]
 
 
 # ============================================
@@ -506,9 +933,9 @@ def get_cached_sentiment(ticker: str, date_str: str) -> Optional[Dict]:
     
     if st.session_state.get('use_turso'):
         try:
-            conn = TursoConnection()
-            rows = conn.fetchall(
-                "SELECT score, summary FROM sentiment_cache WHERE ticker = ? AND date = ?",
+            rows = _cached_fetchall(
+                'sentiment_cache',
+                GET_SENTIMENT_SQL,
                 [ticker, date_str]
             )
             if rows:
@@ -534,29 +961,19 @@ def save_sentiment_cache(ticker: str, date_str: str, score: int, summary: str):
         summary: 要約
     """
     init_database()
-    now = datetime.now().isoformat()
+    now = _now_iso()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('sentiment_cache')
         try:
-            conn = TursoConnection()
-            # テーブル作成（なければ）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS sentiment_cache (
-                    ticker TEXT,
-                    date TEXT,
-                    score INTEGER,
-                    summary TEXT,
-                    updated_at TEXT,
-                    PRIMARY KEY (ticker, date)
-                )
-            """)
-            # Upsert
+            conn = get_connection()
+            # Upsert（テーブルは _ensure_turso_schema で作成済み）
             conn.execute(
-                "INSERT OR REPLACE INTO sentiment_cache (ticker, date, score, summary, updated_at) VALUES (?, ?, ?, ?, ?)",
+                UPSERT_SENTIMENT_SQL,
                 [ticker, date_str, score, summary, now]
             )
-        except Exception as e:
-            print(f"Sentiment cache save error: {e}")
+        except Exception:
+            logger.exception("Sentiment cache save error")
     else:
         # JSONキャッシュ
         cache = load_json_file(SENTIMENT_CACHE_FILE, {})
@@ -566,7 +983,7 @@ def save_sentiment_cache(ticker: str, date_str: str, score: int, summary: str):
             'summary': summary,
             'updated_at': now
         }
-        save_json_file(SENTIMENT_CACHE_FILE, cache)
+        schedule_json_save(SENTIMENT_CACHE_FILE, cache)
 
 
 def clear_sentiment_cache():
@@ -574,11 +991,12 @@ def clear_sentiment_cache():
     init_database()
     
     if st.session_state.get('use_turso'):
+        _invalidate_reads('sentiment_cache')
         try:
-            conn = TursoConnection()
-            conn.execute("DELETE FROM sentiment_cache")
+            conn = get_connection()
+            conn.execute(CLEAR_SENTIMENT_SQL)
         except:
             pass
     else:
-        save_json_file(SENTIMENT_CACHE_FILE, {})
+        schedule_json_save(SENTIMENT_CACHE_FILE, {})
 
@@ -2,199 +2,242 @@
 初心者向け用語解説モジュール（図表付き）
 """
 import streamlit as st
-import plotly.graph_objects as go
+from plotly.graph_objects import Figure
 
 
-def create_candlestick_diagram(candle_type: str) -> go.Figure:
-    """ローソク足の図を生成"""
-    fig = go.Figure()
-    
-    if candle_type == "bullish":
-        fig.add_trace(go.Candlestick(
-            x=[1], open=[100], high=[120], low=[95], close=[115],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a'
-        ))
-        fig.update_layout(title="陽線（上昇）", height=200)
-    elif candle_type == "bearish":
-        fig.add_trace(go.Candlestick(
-            x=[1], open=[115], high=[120], low=[95], close=[100],
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="陰線（下落）", height=200)
-    elif candle_type == "pin_bar_bullish":
-        fig.add_trace(go.Candlestick(
-            x=[1], open=[108], high=[112], low=[90], close=[110],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a'
-        ))
-        fig.update_layout(title="下ヒゲピンバー", height=200)
-    elif candle_type == "pin_bar_bearish":
-        fig.add_trace(go.Candlestick(
-            x=[1], open=[102], high=[120], low=[98], close=[100],
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="上ヒゲピンバー", height=200)
-    elif candle_type == "engulfing_bullish":
-        fig.add_trace(go.Candlestick(
-            x=[1, 2], 
-            open=[110, 95], high=[112, 118], low=[100, 93], close=[102, 115],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a',
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="陽線包み足", height=200)
-    elif candle_type == "engulfing_bearish":
-        fig.add_trace(go.Candlestick(
-            x=[1, 2], 
-            open=[100, 115], high=[110, 118], low=[98, 92], close=[108, 95],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a',
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="陰線包み足", height=200)
-    elif candle_type == "doji":
-        fig.add_trace(go.Candlestick(
+# 図表は固定の説明用なので、生成済みFigureをセッション間で共有して再構築を避ける
+DIAGRAM_CACHE_MAX_ENTRIES = 32
+
+# 静的な説明図（ローソク足・リスクリワード）の表示設定
+# ホバー・ズーム等を無効にした静止プロットとして描画し、ブラウザ側の描画負荷を下げる
+STATIC_CHART_CONFIG = {'staticPlot': True}
+
+# トレンド図・RSI図のサンプルデータ（呼び出し毎にリストを作らないよう共有）
+_TREND_X = tuple(range(10))
+_UPTREND_PRICE = (100, 105, 103, 110, 108, 115, 112, 120, 118, 125)
+_UPTREND_EMA = (98, 100, 102, 104, 106, 108, 110, 112, 114, 116)
+_DOWNTREND_PRICE = (125, 120, 122, 115, 118, 110, 113, 105, 108, 100)
+_DOWNTREND_EMA = (127, 125, 123, 121, 119, 117, 115, 113, 111, 109)
+_PULLBACK_PRICE = (100, 108, 115, 112, 108, 106, 110, 118, 125, 130)
+_RALLY_PRICE = (130, 122, 115, 118, 122, 124, 120, 112, 105, 100)
+_RSI_X = tuple(range(20))
+_RSI_VALUES = (50, 55, 62, 68, 75, 78, 72, 65, 58, 45, 35, 28, 25, 30, 40, 52, 60, 65, 58, 50)
+
+# 図の種類ごとの共通レイアウト（タイトル・高さは各図で上書き）
+_CANDLE_LAYOUT = dict(
+    template='plotly_dark',
+    xaxis_rangeslider_visible=False,
+    showlegend=False,
+    xaxis=dict(showticklabels=False),
+    margin=dict(l=10, r=10, t=40, b=10)
+)
+_TREND_LAYOUT = dict(
+    template='plotly_dark',
+    showlegend=True,
+    legend=dict(orientation="h", yanchor="bottom", y=1.02),
+    xaxis=dict(showticklabels=False),
+    margin=dict(l=10, r=10, t=60, b=10)
+)
+_RSI_LAYOUT = dict(
+    title="RSI（相対力指数）",
+    template='plotly_dark',
+    height=200,
+    yaxis=dict(range=[0, 100]),
+    xaxis=dict(showticklabels=False),
+    margin=dict(l=10, r=10, t=40, b=10),
+    showlegend=False,
+    # 買われすぎ/売られすぎのライン・ゾーン（x方向は描画領域いっぱい）
+    shapes=[
+        dict(type="line", xref="x domain", x0=0, x1=1, y0=70, y1=70, line=dict(color="red", dash="dash")),
+        dict(type="line", xref="x domain", x0=0, x1=1, y0=30, y1=30, line=dict(color="green", dash="dash")),
+        dict(type="rect", xref="x domain", x0=0, x1=1, y0=70, y1=100, fillcolor="red", opacity=0.1, line_width=0),
+        dict(type="rect", xref="x domain", x0=0, x1=1, y0=0, y1=30, fillcolor="green", opacity=0.1, line_width=0),
+    ],
+    annotations=[
+        dict(x=1, xref="x domain", xanchor="right", y=70, yanchor="bottom", text="買われすぎ (70)", showarrow=False),
+        dict(x=1, xref="x domain", xanchor="right", y=30, yanchor="bottom", text="売られすぎ (30)", showarrow=False),
+    ]
+)
+_RISK_REWARD_LAYOUT = dict(
+    title="リスクリワード 1:2",
+    template='plotly_dark',
+    height=200,
+    yaxis=dict(range=[90, 115]),
+    xaxis=dict(showticklabels=False, range=[0, 1.3]),
+    margin=dict(l=10, r=80, t=40, b=10),
+    showlegend=False,
+    # エントリー・損切り・利確ラインとリスク/リワードの帯
+    shapes=[
+        dict(type="line", x0=0, x1=1, y0=100, y1=100, line=dict(color="blue", width=2)),
+        dict(type="line", x0=0, x1=1, y0=95, y1=95, line=dict(color="red", width=2, dash="dash")),
+        dict(type="line", x0=0, x1=1, y0=110, y1=110, line=dict(color="green", width=2, dash="dash")),
+        dict(type="rect", x0=0.4, x1=0.6, y0=95, y1=100, fillcolor="red", opacity=0.3),
+        dict(type="rect", x0=0.4, x1=0.6, y0=100, y1=110, fillcolor="green", opacity=0.3),
+    ],
+    annotations=[
+        dict(x=1.05, y=100, text="エントリー: 100", showarrow=False, xanchor="left"),
+        dict(x=1.05, y=95, text="損切り: 95", showarrow=False, xanchor="left", font=dict(color="red")),
+        dict(x=1.05, y=110, text="利確: 110", showarrow=False, xanchor="left", font=dict(color="green")),
+        dict(x=0.5, y=97.5, text="リスク", showarrow=False),
+        dict(x=0.5, y=105, text="リワード", showarrow=False),
+    ]
+)
+
+
+# ローソク足の色設定
+_UP_COLORS = dict(increasing_line_color='#26a69a', increasing_fillcolor='#26a69a')
+_DOWN_COLORS = dict(decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350')
+_BOTH_COLORS = {**_UP_COLORS, **_DOWN_COLORS}
+
+# 図の種類 → (ローソク足トレース, レイアウト, 注釈[(y, テキスト, ax, ay)])
+_CANDLE_SPECS = {
+    "bullish": (
+        dict(x=[1], open=[100], high=[120], low=[95], close=[115], **_UP_COLORS),
+        dict(title="陽線（上昇）", height=200),
+        ()
+    ),
+    "bearish": (
+        dict(x=[1], open=[115], high=[120], low=[95], close=[100], **_DOWN_COLORS),
+        dict(title="陰線（下落）", height=200),
+        ()
+    ),
+    "pin_bar_bullish": (
+        dict(x=[1], open=[108], high=[112], low=[90], close=[110], **_UP_COLORS),
+        dict(title="下ヒゲピンバー", height=200),
+        ()
+    ),
+    "pin_bar_bearish": (
+        dict(x=[1], open=[102], high=[120], low=[98], close=[100], **_DOWN_COLORS),
+        dict(title="上ヒゲピンバー", height=200),
+        ()
+    ),
+    "engulfing_bullish": (
+        dict(x=[1, 2], open=[110, 95], high=[112, 118], low=[100, 93], close=[102, 115], **_BOTH_COLORS),
+        dict(title="陽線包み足", height=200),
+        ()
+    ),
+    "engulfing_bearish": (
+        dict(x=[1, 2], open=[100, 115], high=[110, 118], low=[98, 92], close=[108, 95], **_BOTH_COLORS),
+        dict(title="陰線包み足", height=200),
+        ()
+    ),
+    "doji": (
+        dict(
             x=[1], open=[105], high=[115], low=[95], close=[105.5],
             increasing_line_color='#9e9e9e', increasing_fillcolor='#9e9e9e'
-        ))
-        fig.update_layout(title="十字線", height=200)
-    elif candle_type == "morning_star":
-        fig.add_trace(go.Candlestick(
-            x=[1, 2, 3], 
+        ),
+        dict(title="十字線", height=200),
+        ()
+    ),
+    "morning_star": (
+        dict(
+            x=[1, 2, 3],
             open=[115, 100, 102], high=[118, 103, 118], low=[98, 98, 100], close=[100, 101, 115],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a',
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="三川明けの明星", height=200)
-    elif candle_type == "evening_star":
-        fig.add_trace(go.Candlestick(
-            x=[1, 2, 3], 
+            **_BOTH_COLORS
+        ),
+        dict(title="三川明けの明星", height=200),
+        ()
+    ),
+    "evening_star": (
+        dict(
+            x=[1, 2, 3],
             open=[100, 115, 113], high=[118, 118, 115], low=[98, 112, 95], close=[115, 114, 98],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a',
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="三川宵の明星", height=200)
-    elif candle_type == "harami":
-        fig.add_trace(go.Candlestick(
-            x=[1, 2], 
-            open=[115, 103], high=[118, 107], low=[98, 100], close=[100, 105],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a',
-            decreasing_line_color='#ef5350', decreasing_fillcolor='#ef5350'
-        ))
-        fig.update_layout(title="はらみ線", height=200)
-    elif candle_type == "structure":
-        fig.add_trace(go.Candlestick(
-            x=[1], open=[100], high=[120], low=[90], close=[115],
-            increasing_line_color='#26a69a', increasing_fillcolor='#26a69a'
-        ))
-        fig.add_annotation(x=1, y=120, text="高値", showarrow=True, arrowhead=2, ax=40, ay=0)
-        fig.add_annotation(x=1, y=90, text="安値", showarrow=True, arrowhead=2, ax=40, ay=0)
-        fig.add_annotation(x=1, y=115, text="終値", showarrow=True, arrowhead=2, ax=-40, ay=-20)
-        fig.add_annotation(x=1, y=100, text="始値", showarrow=True, arrowhead=2, ax=-40, ay=20)
-        fig.update_layout(title="ローソク足の構造", height=250)
-    
-    fig.update_layout(
-        template='plotly_dark',
-        xaxis_rangeslider_visible=False,
-        showlegend=False,
-        xaxis=dict(showticklabels=False),
-        margin=dict(l=10, r=10, t=40, b=10)
+            **_BOTH_COLORS
+        ),
+        dict(title="三川宵の明星", height=200),
+        ()
+    ),
+    "harami": (
+        dict(x=[1, 2], open=[115, 103], high=[118, 107], low=[98, 100], close=[100, 105], **_BOTH_COLORS),
+        dict(title="はらみ線", height=200),
+        ()
+    ),
+    "structure": (
+        dict(x=[1], open=[100], high=[120], low=[90], close=[115], **_UP_COLORS),
+        dict(title="ローソク足の構造", height=250),
+        ((120, "高値", 40, 0), (90, "安値", 40, 0), (115, "終値", -40, -20), (100, "始値", -40, 20))
+    ),
+}
+
+
+@st.cache_resource(max_entries=DIAGRAM_CACHE_MAX_ENTRIES, show_spinner=False)
+def create_candlestick_diagram(candle_type: str) -> Figure:
+    """ローソク足の図を生成"""
+    # トレース・レイアウトはdictで組み立て、最後に1回だけFigure化する
+    # （add_trace/update_layout毎にバリデーションが走るのを避ける）
+    candle, layout, annotations = _CANDLE_SPECS.get(candle_type, (None, {}, ()))
+    
+    # 注釈もadd_annotationで1件ずつ追加せず、レイアウトに一括で渡す
+    if annotations:
+        layout = {**layout, 'annotations': [
+            dict(x=1, y=y, text=text, showarrow=True, arrowhead=2, ax=ax, ay=ay)
+            for y, text, ax, ay in annotations
+        ]}
+    
+    return Figure(
+        data=[dict(type='candlestick', **candle)] if candle else [],
+        layout={**_CANDLE_LAYOUT, **layout}
     )
-    return fig
 
 
-def create_trend_diagram(trend_type: str) -> go.Figure:
+@st.cache_resource(max_entries=DIAGRAM_CACHE_MAX_ENTRIES, show_spinner=False)
+def create_trend_diagram(trend_type: str) -> Figure:
     """トレンドの図を生成"""
-    fig = go.Figure()
+    data = []
+    layout = {}
+    zone = None
     
     if trend_type == "uptrend":
-        x = list(range(10))
-        y = [100, 105, 103, 110, 108, 115, 112, 120, 118, 125]
-        fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name='価格', line=dict(color='#26a69a')))
-        fig.add_trace(go.Scatter(x=x, y=[98, 100, 102, 104, 106, 108, 110, 112, 114, 116], 
-                                  mode='lines', name='EMA200', line=dict(color='#FF9800', dash='dash')))
-        fig.update_layout(title="上昇トレンド（価格 > EMA）", height=200)
+        data = [
+            dict(type='scatter', x=_TREND_X, y=_UPTREND_PRICE, mode='lines+markers', name='価格', line=dict(color='#26a69a')),
+            dict(type='scatter', x=_TREND_X, y=_UPTREND_EMA,
+                 mode='lines', name='EMA200', line=dict(color='#FF9800', dash='dash'))
+        ]
+        layout = dict(title="上昇トレンド（価格 > EMA）", height=200)
     elif trend_type == "downtrend":
-        x = list(range(10))
-        y = [125, 120, 122, 115, 118, 110, 113, 105, 108, 100]
-        fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name='価格', line=dict(color='#ef5350')))
-        fig.add_trace(go.Scatter(x=x, y=[127, 125, 123, 121, 119, 117, 115, 113, 111, 109], 
-                                  mode='lines', name='EMA200', line=dict(color='#FF9800', dash='dash')))
-        fig.update_layout(title="下落トレンド（価格 < EMA）", height=200)
+        data = [
+            dict(type='scatter', x=_TREND_X, y=_DOWNTREND_PRICE, mode='lines+markers', name='価格', line=dict(color='#ef5350')),
+            dict(type='scatter', x=_TREND_X, y=_DOWNTREND_EMA,
+                 mode='lines', name='EMA200', line=dict(color='#FF9800', dash='dash'))
+        ]
+        layout = dict(title="下落トレンド（価格 < EMA）", height=200)
     elif trend_type == "pullback":
-        x = list(range(10))
-        y = [100, 108, 115, 112, 108, 106, 110, 118, 125, 130]
-        fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name='価格', line=dict(color='#26a69a')))
-        fig.add_vrect(x0=3.5, x1=5.5, fillcolor="yellow", opacity=0.3, line_width=0)
-        fig.add_annotation(x=4.5, y=104, text="押し目", showarrow=False, font=dict(size=14))
-        fig.update_layout(title="押し目（買いチャンス）", height=200)
+        data = [dict(type='scatter', x=_TREND_X, y=_PULLBACK_PRICE, mode='lines+markers', name='価格', line=dict(color='#26a69a'))]
+        zone = (104, "押し目")
+        layout = dict(title="押し目（買いチャンス）", height=200)
     elif trend_type == "rally":
-        x = list(range(10))
-        y = [130, 122, 115, 118, 122, 124, 120, 112, 105, 100]
-        fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name='価格', line=dict(color='#ef5350')))
-        fig.add_vrect(x0=3.5, x1=5.5, fillcolor="yellow", opacity=0.3, line_width=0)
-        fig.add_annotation(x=4.5, y=126, text="戻り", showarrow=False, font=dict(size=14))
-        fig.update_layout(title="戻り（売りチャンス）", height=200)
-    
-    fig.update_layout(
-        template='plotly_dark',
-        showlegend=True,
-        legend=dict(orientation="h", yanchor="bottom", y=1.02),
-        xaxis=dict(showticklabels=False),
-        margin=dict(l=10, r=10, t=60, b=10)
+        data = [dict(type='scatter', x=_TREND_X, y=_RALLY_PRICE, mode='lines+markers', name='価格', line=dict(color='#ef5350'))]
+        zone = (126, "戻り")
+        layout = dict(title="戻り（売りチャンス）", height=200)
+    
+    # 押し目・戻りのゾーン（縦帯＋ラベル）はレイアウトに一括で渡す
+    if zone is not None:
+        zone_y, zone_text = zone
+        layout['shapes'] = [dict(
+            type="rect", x0=3.5, x1=5.5, xref="x", y0=0, y1=1, yref="y domain",
+            fillcolor="yellow", opacity=0.3, line_width=0
+        )]
+        layout['annotations'] = [dict(x=4.5, y=zone_y, text=zone_text, showarrow=False, font=dict(size=14))]
+    
+    return Figure(
+        data=data,
+        layout={**_TREND_LAYOUT, **layout}
     )
-    return fig
 
 
-def create_rsi_diagram() -> go.Figure:
+@st.cache_resource(max_entries=DIAGRAM_CACHE_MAX_ENTRIES, show_spinner=False)
+def create_rsi_diagram() -> Figure:
     """RSIの図を生成"""
-    fig = go.Figure()
-    
-    x = list(range(20))
-    rsi = [50, 55, 62, 68, 75, 78, 72, 65, 58, 45, 35, 28, 25, 30, 40, 52, 60, 65, 58, 50]
-    
-    fig.add_trace(go.Scatter(x=x, y=rsi, mode='lines', name='RSI', line=dict(color='#9C27B0', width=2)))
-    fig.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="買われすぎ (70)")
-    fig.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="売られすぎ (30)")
-    fig.add_hrect(y0=70, y1=100, fillcolor="red", opacity=0.1, line_width=0)
-    fig.add_hrect(y0=0, y1=30, fillcolor="green", opacity=0.1, line_width=0)
-    
-    fig.update_layout(
-        title="RSI（相対力指数）",
-        template='plotly_dark',
-        height=200,
-        yaxis=dict(range=[0, 100]),
-        xaxis=dict(showticklabels=False),
-        margin=dict(l=10, r=10, t=40, b=10),
-        showlegend=False
+    return Figure(
+        data=[dict(type='scatter', x=_RSI_X, y=_RSI_VALUES, mode='lines', name='RSI', line=dict(color='#9C27B0', width=2))],
+        layout=_RSI_LAYOUT
     )
-    return fig
 
 
-def create_risk_reward_diagram() -> go.Figure:
+@st.cache_resource(max_entries=DIAGRAM_CACHE_MAX_ENTRIES, show_spinner=False)
+def create_risk_reward_diagram() -> Figure:
     """リスクリワードの図を生成"""
-    fig = go.Figure()
-    
-    fig.add_shape(type="line", x0=0, x1=1, y0=100, y1=100, line=dict(color="blue", width=2))
-    fig.add_shape(type="line", x0=0, x1=1, y0=95, y1=95, line=dict(color="red", width=2, dash="dash"))
-    fig.add_shape(type="line", x0=0, x1=1, y0=110, y1=110, line=dict(color="green", width=2, dash="dash"))
-    
-    fig.add_annotation(x=1.05, y=100, text="エントリー: 100", showarrow=False, xanchor="left")
-    fig.add_annotation(x=1.05, y=95, text="損切り: 95", showarrow=False, xanchor="left", font=dict(color="red"))
-    fig.add_annotation(x=1.05, y=110, text="利確: 110", showarrow=False, xanchor="left", font=dict(color="green"))
-    
-    fig.add_shape(type="rect", x0=0.4, x1=0.6, y0=95, y1=100, fillcolor="red", opacity=0.3)
-    fig.add_shape(type="rect", x0=0.4, x1=0.6, y0=100, y1=110, fillcolor="green", opacity=0.3)
-    fig.add_annotation(x=0.5, y=97.5, text="リスク", showarrow=False)
-    fig.add_annotation(x=0.5, y=105, text="リワード", showarrow=False)
-    
-    fig.update_layout(
-        title="リスクリワード 1:2",
-        template='plotly_dark',
-        height=200,
-        yaxis=dict(range=[90, 115]),
-        xaxis=dict(showticklabels=False, range=[0, 1.3]),
-        margin=dict(l=10, r=80, t=40, b=10),
-        showlegend=False
-    )
-    return fig
+    return Figure(layout=_RISK_REWARD_LAYOUT)
 
 
 def render_glossary_page():
@@ -229,17 +272,17 @@ def render_candlestick_basics():
     st.subheader("🕯️ ローソク足の基本")
     
     with st.expander("**ローソク足の構造**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("structure"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("structure"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("一定期間の値動きを1本の棒で表したもの。始値・終値・高値・安値の4つの価格情報を含む。")
         st.info("💡 日本発祥のチャート表示方法で、世界中で使われています。")
     
     with st.expander("**陽線（ようせん）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("bullish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("bullish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("終値が始値より高い（上昇した）ローソク足。緑や白で表示されることが多い。")
         st.info("💡 買いの勢いが強かったことを示します。")
     
     with st.expander("**陰線（いんせん）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("bearish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("bearish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("終値が始値より低い（下落した）ローソク足。赤や黒で表示されることが多い。")
         st.info("💡 売りの勢いが強かったことを示します。")
     
@@ -334,43 +377,43 @@ def render_chart_patterns():
     st.subheader("📈 チャートパターン")
     
     with st.expander("**ピンバー（下ヒゲ・買いシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("pin_bar_bullish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("pin_bar_bullish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("長い下ヒゲと短い実体を持つローソク足。下落が止まり上昇に転じるサイン。")
         st.info("💡 下落トレンドの底で出現すると信頼度が高い！")
     
     with st.expander("**ピンバー（上ヒゲ・売りシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("pin_bar_bearish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("pin_bar_bearish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("長い上ヒゲと短い実体を持つローソク足。上昇が止まり下落に転じるサイン。")
         st.info("💡 上昇トレンドの天井で出現すると信頼度が高い！")
     
     with st.expander("**陽線包み足（買いシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("engulfing_bullish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("engulfing_bullish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("前の陰線を完全に包み込む大きな陽線。強い買いシグナル。")
         st.info("💡 「前日の売りを今日の買いが飲み込んだ」イメージです。")
     
     with st.expander("**陰線包み足（売りシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("engulfing_bearish"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("engulfing_bearish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("前の陽線を完全に包み込む大きな陰線。強い売りシグナル。")
         st.info("💡 「前日の買いを今日の売りが飲み込んだ」イメージです。")
     
     with st.expander("**十字線（同事線）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("doji"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("doji"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("始値と終値がほぼ同じで、実体がほとんどないローソク足。")
         st.info("💡 相場の迷いを示し、トレンド転換の可能性を示唆します。")
     
     with st.expander("**はらみ線**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("harami"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("harami"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("前のローソク足の実体の中に収まる小さなローソク足。")
         st.info("💡 トレンド転換の兆候ですが、包み足ほど強いシグナルではありません。")
     
     with st.expander("**三川明けの明星（強い買いシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("morning_star"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("morning_star"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("下落後に現れる3本のパターン。陰線→小さい足→陽線。")
         st.markdown("1. 大きな陰線（下落継続）\n2. 小さな足（迷い）\n3. 大きな陽線（反転上昇）")
         st.info("💡 強い上昇転換シグナル！底打ちのサインです。")
     
     with st.expander("**三川宵の明星（強い売りシグナル）**", expanded=False):
-        st.plotly_chart(create_candlestick_diagram("evening_star"), use_container_width=True)
+        st.plotly_chart(create_candlestick_diagram("evening_star"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("上昇後に現れる3本のパターン。陽線→小さい足→陰線。")
         st.markdown("1. 大きな陽線（上昇継続）\n2. 小さな足（迷い）\n3. 大きな陰線（反転下落）")
         st.info("💡 強い下落転換シグナル！天井のサインです。")
@@ -411,9 +454,9 @@ def render_signal_terms():
     with st.expander("**トリガー**", expanded=False):
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(create_candlestick_diagram("pin_bar_bullish"), use_container_width=True)
+            st.plotly_chart(create_candlestick_diagram("pin_bar_bullish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         with col2:
-            st.plotly_chart(create_candlestick_diagram("engulfing_bullish"), use_container_width=True)
+            st.plotly_chart(create_candlestick_diagram("engulfing_bullish"), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("実際にエントリーするきっかけとなるシグナル。")
         st.markdown("""
         **買いトリガーの例:**
@@ -463,7 +506,7 @@ def render_trade_terms():
     st.subheader("💹 トレード用語")
     
     with st.expander("**リスクリワード比率**", expanded=False):
-        st.plotly_chart(create_risk_reward_diagram(), use_container_width=True)
+        st.plotly_chart(create_risk_reward_diagram(), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("想定される損失（リスク）と利益（リワード）の比率。")
         st.markdown("""
         **リスクリワード 1:2 の場合:**
@@ -487,7 +530,7 @@ def render_trade_terms():
         st.info("💡 準備なしのエントリーはギャンブルです！")
     
     with st.expander("**損切り（ストップロス）**", expanded=False):
-        st.plotly_chart(create_risk_reward_diagram(), use_container_width=True)
+        st.plotly_chart(create_risk_reward_diagram(), use_container_width=True, config=STATIC_CHART_CONFIG)
         st.write("損失を限定するために、あらかじめ決めた価格で決済すること。")
         st.markdown("""
         **損切りの設定例:**
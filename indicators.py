@@ -6,41 +6,69 @@ import pandas as pd
 import numpy as np
 
 
-def calculate_ema(series: pd.Series, period: int) -> pd.Series:
+# 指標列の保持に使うdtype（価格の表示・判定にはfloat32で十分）
+INDICATOR_DTYPE = np.float32
+
+
+def calculate_ema(series: pd.Series, period: int, sma_seed: bool = False) -> pd.Series:
     """
     指数移動平均（EMA）を計算
     
     Args:
         series: 価格データ（通常は終値）
         period: EMA期間
+        sma_seed: Trueなら最初のperiod本の単純平均を初期値にする
+            （先頭period-1本はNaN。データがperiod本未満なら通常のEMAを返す）
     
     Returns:
         EMA値のSeries
     """
+    if sma_seed and len(series) >= period:
+        # 初期値より前をNaNにすると、ewmはNaNを出力したまま初期値から再帰計算を始める
+        values = series.to_numpy(dtype=np.float64, copy=True)
+        values[period - 1] = values[:period].mean()
+        values[:period - 1] = np.nan
+        series = pd.Series(values, index=series.index)
     return series.ewm(span=period, adjust=False).mean()
 
 
-def calculate_rsi(series: pd.Series, period: int = 14) -> pd.Series:
+def calculate_rsi(series: pd.Series, period: int = 14, wilder: bool = True) -> pd.Series:
     """
     RSI（相対力指数）を計算
     
     Args:
         series: 価格データ（通常は終値）
         period: RSI期間（デフォルト: 14）
+        wilder: TrueならWilderの平滑化（alpha=1/period、TradingView・TA-Libと同じ）、
+            Falseなら従来のEMA平滑化（span=period）
     
     Returns:
         RSI値のSeries（0-100の範囲）
     """
-    delta = series.diff()
-    
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
-    
-    avg_gain = gain.ewm(span=period, adjust=False).mean()
-    avg_loss = loss.ewm(span=period, adjust=False).mean()
+    # 差分はSeriesを経由せずndarrayで計算（先頭は変化なし=0として扱う）
+    values = series.to_numpy(dtype=np.float64)
+    delta = np.diff(values, prepend=values[:1])
+
+    # 欠損による差分NaNは変化なし扱い
+    np.nan_to_num(delta, copy=False)
+    
+    # 上昇幅・下落幅を2列にまとめ、平滑化を1回のewmで計算
+    # 分岐なしで分割: 上昇幅 = (Δ + |Δ|) / 2、下落幅 = |Δ| - 上昇幅
+    moves = np.empty((len(delta), 2))
+    abs_delta = np.abs(delta)
+    gain = np.add(delta, abs_delta, out=moves[:, 0])
+    gain *= 0.5
+    np.subtract(abs_delta, gain, out=moves[:, 1])
+    if wilder:
+        smoother = pd.DataFrame(moves).ewm(alpha=1.0 / period, adjust=False)
+    else:
+        smoother = pd.DataFrame(moves).ewm(span=period, adjust=False)
+    averages = smoother.mean().to_numpy()
+    avg_gain = averages[:, 0]
+    avg_loss = averages[:, 1]
     
     # ゼロ除算対策
-    rs = np.where(avg_loss != 0, avg_gain / avg_loss, 0)
+    rs = np.divide(avg_gain, avg_loss, out=np.zeros_like(avg_gain), where=avg_loss != 0)
     rsi = 100 - (100 / (1 + rs))
     
     return pd.Series(rsi, index=series.index)
@@ -56,19 +84,25 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         指標が追加されたDataFrame
     """
-    df = df.copy()
-    
-    # EMA
-    df['ema_20'] = calculate_ema(df['close'], 20)
-    df['ema_200'] = calculate_ema(df['close'], 200)
-    
-    # RSI
-    df['rsi'] = calculate_rsi(df['close'], 14)
+    # 終値は1回だけ取り出し、各指標をndarrayで計算
+    close = df['close']
+    close_values = close.to_numpy(dtype=np.float64)
+    ema_20 = calculate_ema(close, 20).to_numpy()
+    ema_200 = calculate_ema(close, 200).to_numpy()
+    rsi = calculate_rsi(close, 14).to_numpy()
     
     # 20EMAからの乖離率（%）
-    df['ema_20_distance'] = ((df['close'] - df['ema_20']) / df['ema_20']) * 100
-    
-    return df
+    ema_20_distance = (close_values - ema_20) / ema_20 * 100
+    
+    # 元のDataFrameは変更せず、指標列だけを追加した新しいDataFrameを返す
+    # （assignは浅いコピーなので、df.copy()のようにOHLCV全体を複製しない）
+    # 計算はfloat64で行い、保持する列は表示・判定に十分なfloat32に落とす
+    return df.assign(
+        ema_20=ema_20.astype(INDICATOR_DTYPE),
+        ema_200=ema_200.astype(INDICATOR_DTYPE),
+        rsi=rsi.astype(INDICATOR_DTYPE),
+        ema_20_distance=ema_20_distance.astype(INDICATOR_DTYPE)
+    )
 
 
 def is_near_ema20(row: pd.Series, threshold: float = 0.5) -> bool:
@@ -81,5 +115,22 @@ def is_near_ema20(row: pd.Series, threshold: float = 0.5) -> bool:
     
     Returns:
         20EMA付近にあればTrue
+    
+    Note:
+        1行ずつの判定用。複数行をまとめて判定する場合は near_ema20_mask を使う
     """
     return abs(row['ema_20_distance']) <= threshold
+
+
+def near_ema20_mask(df: pd.DataFrame, threshold: float = 0.5) -> np.ndarray:
+    """
+    全行について価格が20EMA付近にあるかを一括判定
+    
+    Args:
+        df: add_indicators で指標が追加されたDataFrame
+        threshold: 乖離率の閾値（%）
+    
+    Returns:
+        20EMA付近の行がTrueのブール配列（乖離率がNaNの行はFalse）
+    """
+    return np.abs(df['ema_20_distance'].to_numpy(dtype=np.float64)) <= threshold
@@ -5,10 +5,31 @@ LightGBMを使用した株価騰落予測
 import os
 from pathlib import Path
 from typing import Optional, Dict, List
+import streamlit as st
 import pandas as pd
 import numpy as np
 
 
+@st.cache_resource(show_spinner=False)
+def _load_model_file(model_path: str):
+    """
+    学習済みモデルファイルを読み込む（プロセス内で共有）
+    
+    Streamlitの再実行ごとに StockPredictor が作られても、
+    unpickleはパスごとに1回だけ行う
+    
+    Args:
+        model_path: 学習済みモデルのパス
+    
+    Returns:
+        読み込んだモデル
+    """
+    import joblib
+    model = joblib.load(model_path)
+    print(f"Model loaded from {model_path}")
+    return model
+
+
 class StockPredictor:
     """株価騰落予測クラス"""
     
@@ -18,6 +39,9 @@ class StockPredictor:
             model_path: 学習済みモデルのパス
         """
         self.model = None
+        # 予測メソッドはロード時に1回だけ解決する（predict_probaがなければNone）
+        self._predict = None
+        self._predict_proba = None
         self.feature_names = ['rsi', 'ema_ratio', 'volume_ratio', 'sentiment', 'price_change_5d']
         
         if model_path is None:
@@ -28,10 +52,11 @@ class StockPredictor:
     def _load_model(self, model_path):
         """モデルをロード"""
         try:
-            import joblib
+            # 存在確認は毎回行い、未学習の状態（None）はキャッシュしない
             if os.path.exists(model_path):
-                self.model = joblib.load(model_path)
-                print(f"Model loaded from {model_path}")
+                self.model = _load_model_file(str(model_path))
+                self._predict = self.model.predict
+                self._predict_proba = getattr(self.model, 'predict_proba', None)
             else:
                 print(f"Model not found: {model_path}")
         except ImportError:
@@ -43,7 +68,7 @@ class StockPredictor:
         """モデルが利用可能かどうか"""
         return self.model is not None
     
-    def prepare_features(self, df: pd.DataFrame, sentiment_score: int = 50) -> pd.DataFrame:
+    def prepare_features(self, df: pd.DataFrame, sentiment_score: int = 50) -> Optional[np.ndarray]:
         """
         テクニカルデータと感情スコアから特徴量を作成
         
@@ -52,27 +77,30 @@ class StockPredictor:
             sentiment_score: 感情スコア (0-100)
         
         Returns:
-            特徴量DataFrame
+            特徴量の配列（形状 (1, 特徴量数)、列順は feature_names）。データ不足ならNone
         """
         if df.empty or len(df) < 5:
-            return pd.DataFrame()
+            return None
         
-        latest = df.iloc[-1]
+        # 行Seriesは作らず、列のndarrayから直接値を取り出す
+        close = df['close'].to_numpy()
+        latest_close = close[-1]
         
         # 特徴量作成
         features = {}
         
         # RSI
-        features['rsi'] = latest.get('rsi', 50)
+        features['rsi'] = df['rsi'].to_numpy()[-1] if 'rsi' in df.columns else 50
         
         # EMA比率（現在価格 / EMA200）
-        ema_200 = latest.get('ema_200', latest['close'])
-        features['ema_ratio'] = (latest['close'] / ema_200) if ema_200 > 0 else 1.0
+        ema_200 = df['ema_200'].to_numpy()[-1] if 'ema_200' in df.columns else latest_close
+        features['ema_ratio'] = (latest_close / ema_200) if ema_200 > 0 else 1.0
         
         # 出来高比率（直近出来高 / 5日平均出来高）
         if 'volume' in df.columns and len(df) >= 5:
-            avg_volume = df['volume'].tail(5).mean()
-            features['volume_ratio'] = (latest['volume'] / avg_volume) if avg_volume > 0 else 1.0
+            volume = df['volume'].to_numpy()
+            avg_volume = np.nanmean(volume[-5:])
+            features['volume_ratio'] = (volume[-1] / avg_volume) if avg_volume > 0 else 1.0
         else:
             features['volume_ratio'] = 1.0
         
@@ -81,12 +109,13 @@ class StockPredictor:
         
         # 5日間の価格変化率
         if len(df) >= 5:
-            price_5d_ago = df['close'].iloc[-5]
-            features['price_change_5d'] = (latest['close'] - price_5d_ago) / price_5d_ago if price_5d_ago > 0 else 0
+            price_5d_ago = close[-5]
+            features['price_change_5d'] = (latest_close - price_5d_ago) / price_5d_ago if price_5d_ago > 0 else 0
         else:
             features['price_change_5d'] = 0
         
-        return pd.DataFrame([features])
+        # 1行分のDataFrameは作らず、モデルにそのまま渡せる2次元配列で返す
+        return np.array([[features[name] for name in self.feature_names]], dtype=np.float64)
     
     def predict(self, df: pd.DataFrame, sentiment_score: int = 50) -> Dict:
         """
@@ -106,16 +135,16 @@ class StockPredictor:
         # 特徴量作成
         features = self.prepare_features(df, sentiment_score)
         
-        if features.empty:
+        if features is None:
             return {'prediction': 0, 'confidence': 0, 'direction': '不明'}
         
         try:
             # 予測実行
-            prediction = self.model.predict(features)[0]
+            prediction = self._predict(features)[0]
             
             # 確率が取得できる場合
-            if hasattr(self.model, 'predict_proba'):
-                proba = self.model.predict_proba(features)[0]
+            if self._predict_proba is not None:
+                proba = self._predict_proba(features)[0]
                 confidence = max(proba) * 100
             else:
                 confidence = 50
@@ -209,18 +238,20 @@ def train_model(ticker_list: List[str], output_path: str = 'models/lgbm_model.pk
             if len(df) < 50:
                 continue
             
-            # 指標計算
-            df['rsi'] = calculate_rsi(df['Close'], 14)
-            df['ema_200'] = df['Close'].ewm(span=200, adjust=False).mean()
-            df['ema_ratio'] = df['Close'] / df['ema_200']
-            df['volume_ratio'] = df['Volume'] / df['Volume'].rolling(5).mean()
-            df['price_change_5d'] = df['Close'].pct_change(5)
-            
-            # ターゲット: 翌日リターン
-            df['target'] = df['Close'].shift(-1) / df['Close'] - 1
-            
-            # 感情スコアはダミー（50固定）
-            df['sentiment'] = 0.5
+            # 特徴量とターゲットだけを1つのDataFrameにまとめて作成
+            # （OHLCVの元データに中間列を追加していかない）
+            close = df['Close']
+            volume = df['Volume']
+            df = pd.DataFrame({
+                'rsi': calculate_rsi(close, 14),
+                'ema_ratio': close / close.ewm(span=200, adjust=False).mean(),
+                'volume_ratio': volume / volume.rolling(5).mean(),
+                # 感情スコアはダミー（50固定）
+                'sentiment': 0.5,
+                'price_change_5d': close.pct_change(5),
+                # ターゲット: 翌日リターン
+                'target': close.shift(-1) / close - 1
+            }, index=df.index)
             
             # NaN除去
             df = df.dropna()
@@ -255,7 +286,9 @@ def train_model(ticker_list: List[str], output_path: str = 'models/lgbm_model.pk
         'objective': 'regression',
         'metric': 'rmse',
         'boosting_type': 'gbdt',
-        'num_leaves': 31,
+        # 特徴量5つの回帰なので浅い木で十分（推論時の木の走査コストを抑える）
+        'num_leaves': 15,
+        'max_depth': 6,
         'learning_rate': 0.05,
         'feature_fraction': 0.9,
         'verbose': -1
@@ -265,9 +298,9 @@ def train_model(ticker_list: List[str], output_path: str = 'models/lgbm_model.pk
     model = lgb.train(
         params,
         train_data,
-        num_boost_round=100,
+        num_boost_round=50,
         valid_sets=[valid_data],
-        callbacks=[lgb.early_stopping(10)]
+        callbacks=[lgb.early_stopping(5)]
     )
     
     # 保存
@@ -279,9 +312,13 @@ def train_model(ticker_list: List[str], output_path: str = 'models/lgbm_model.pk
 def calculate_rsi(prices, period=14):
     """RSI計算（学習用）"""
     delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
+    # 上昇幅・下落幅を2列にまとめ、移動平均を1回のrollingで計算
+    moves = pd.DataFrame({
+        'gain': delta.where(delta > 0, 0),
+        'loss': -delta.where(delta < 0, 0)
+    })
+    averages = moves.rolling(window=period).mean()
+    rs = averages['gain'] / averages['loss']
     return 100 - (100 / (1 + rs))
 
 
@@ -5,7 +5,9 @@
 import os
 import sys
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 
 # 環境変数から設定を取得
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "")
@@ -15,6 +17,22 @@ TURSO_AUTH_TOKEN = os.getenv("TURSO_AUTH_TOKEN", "")
 # 監視対象銘柄（カンマ区切り）
 WATCHLIST = os.getenv("WATCHLIST", "AAPL,NVDA,GOOGL").split(",")
 
+# シグナル種別ごとのEmbed表示（色, 絵文字, 名称）。"buy" 以外は売り扱い
+_EMBED_META = {
+    "buy": (0x00FF00, "🟢", "買いシグナル"),
+    "sell": (0xFF0000, "🔴", "売りシグナル"),
+}
+_EMBED_FOOTER = {"text": "Stock Signal Monitor (GitHub Actions)"}
+
+# Discord通知の同時送信数（Webhookのレート制限: 2秒あたり5件程度に収める）
+DISCORD_MAX_WORKERS = 4
+
+
+@lru_cache(maxsize=1)
+def _get_http_session() -> requests.Session:
+    """Discord送信用の共有requests.Session（複数シグナル送信時に接続を再利用）"""
+    return requests.Session()
+
 
 def send_discord_notification(ticker: str, signal_type: str, message: str, 
                                entry: float = None, stop_loss: float = None, take_profit: float = None):
@@ -23,9 +41,7 @@ def send_discord_notification(ticker: str, signal_type: str, message: str,
         print("Discord Webhook URLが設定されていません")
         return False
     
-    color = 0x00FF00 if signal_type == "buy" else 0xFF0000
-    emoji = "🟢" if signal_type == "buy" else "🔴"
-    signal_name = "買いシグナル" if signal_type == "buy" else "売りシグナル"
+    color, emoji, signal_name = _EMBED_META.get(signal_type, _EMBED_META["sell"])
     
     embed = {
         "title": f"{emoji} {ticker} - {signal_name}",
@@ -42,12 +58,12 @@ def send_discord_notification(ticker: str, signal_type: str, message: str,
     if take_profit is not None:
         embed["fields"].append({"name": "利確目標", "value": f"{take_profit:.2f}", "inline": True})
     
-    embed["footer"] = {"text": "Stock Signal Monitor (GitHub Actions)"}
+    embed["footer"] = _EMBED_FOOTER
     
     payload = {"embeds": [embed]}
     
     try:
-        response = requests.post(
+        response = _get_http_session().post(
             DISCORD_WEBHOOK_URL,
             json=payload,
             headers={"Content-Type": "application/json"},
@@ -59,47 +75,160 @@ def send_discord_notification(ticker: str, signal_type: str, message: str,
         return False
 
 
-def check_signal(ticker: str) -> dict:
-    """銘柄のシグナルをチェック"""
+@lru_cache(maxsize=None)
+def _exchange_timezone(ticker: str):
+    """銘柄の取引所タイムゾーン名を取得（取得できなければNone）"""
     try:
         import yfinance as yf
+        return yf.Ticker(ticker).fast_info['timezone']
+    except Exception as e:
+        print(f"タイムゾーン取得エラー ({ticker}): {e}")
+        return None
+
+
+def fetch_watchlist_data(tickers: list, period: str, interval: str) -> dict:
+    """
+    監視銘柄の価格データを yf.download でまとめて取得
+    
+    Args:
+        tickers: 銘柄コードのリスト
+        period: 取得期間
+        interval: 時間足
+    
+    Returns:
+        {銘柄コード: OHLCVのDataFrame} の辞書（取得できなかった銘柄は含まない）
+    """
+    import yfinance as yf
+    import pandas as pd
+    
+    if not tickers:
+        return {}
+    
+    try:
+        data = yf.download(
+            tickers,
+            period=period,
+            interval=interval,
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False
+        )
+    except Exception as e:
+        print(f"データ一括取得エラー ({interval}): {e}")
+        return {}
+    
+    frames = {}
+    for ticker in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                df = data[ticker]
+            else:
+                df = data
+        except KeyError:
+            continue
+        # 一括取得では銘柄間で時刻が揃えられるため、その銘柄に無い行を除く
+        df = df.dropna(how='all')
+        if df.empty:
+            continue
+        # 一括取得では全銘柄が共通のタイムゾーンに変換されるため、取引所の時刻に戻す
+        # （4時間足の区切りを Ticker.history と同じく取引所の0時基準にする）
+        if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+            tz = _exchange_timezone(ticker)
+            if tz:
+                df = df.tz_convert(tz)
+        frames[ticker] = df
+    
+    return frames
+
+
+def resample_4h(df_1h):
+    """
+    1時間足を4時間足に集約
+    
+    df_1h.resample('4h').agg(first/max/min/last/sum).dropna() と同じ結果を、
+    groupbyを使わずNumPyの区間集約（reduceat）で計算する
+    
+    Args:
+        df_1h: 1時間足データ（時刻昇順、列名は小文字）
+    
+    Returns:
+        4時間足のDataFrame
+    """
+    import numpy as np
+    import pandas as pd
+    
+    index = df_1h.index
+    # resampleの既定（origin='start_day'）と同じく、先頭日の0時から4時間刻みで区切る
+    step = 4 * 3600 * 10**9
+    origin = index[0].normalize().value
+    bucket = (index.as_unit('ns').asi8 - origin) // step
+    
+    # 各区間の先頭行・末尾行（データの無い区間は生じない）
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(df_1h)] - 1
+    
+    df_4h = pd.DataFrame({
+        'open': df_1h['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df_1h['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df_1h['low'].to_numpy(), starts),
+        'close': df_1h['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(df_1h['volume'].to_numpy(), starts)
+    }, index=pd.DatetimeIndex(origin + bucket[starts] * step, tz='UTC').tz_convert(index.tz))
+    
+    return df_4h.dropna()
+
+
+def check_signal(ticker: str, df_15m, df_1h) -> dict:
+    """
+    銘柄のシグナルをチェック
+    
+    Args:
+        ticker: 銘柄コード
+        df_15m: 15分足データ（fetch_watchlist_data で取得したもの、なければNone）
+        df_1h: 1時間足データ（同上）
+    
+    Returns:
+        シグナル判定結果の辞書
+    """
+    try:
+        import numpy as np
         import pandas as pd
         
-        # データ取得
-        stock = yf.Ticker(ticker)
-        df_15m = stock.history(period="5d", interval="15m")
-        df_1h = stock.history(period="1mo", interval="1h")
-        
-        if df_15m.empty or df_1h.empty:
+        if df_15m is None or df_1h is None or df_15m.empty or df_1h.empty:
             return {"signal": None}
         
-        # カラム名を小文字に
-        df_15m.columns = [c.lower() for c in df_15m.columns]
-        df_1h.columns = [c.lower() for c in df_1h.columns]
+        # カラム名を小文字に（一括取得結果を書き換えないようコピーに対して行う）
+        df_15m = df_15m.rename(columns=str.lower)
+        df_1h = df_1h.rename(columns=str.lower)
         
         # 4時間足に変換
-        df_4h = df_1h.resample('4h').agg({
-            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-        }).dropna()
+        df_4h = resample_4h(df_1h)
         
         # EMA計算
         for df in [df_15m, df_4h]:
-            df['ema_20'] = df['close'].ewm(span=20, adjust=False).mean()
-            df['ema_200'] = df['close'].ewm(span=200, adjust=False).mean()
+            close = df['close']
+            df['ema_20'] = close.ewm(span=20, adjust=False).mean()
+            df['ema_200'] = close.ewm(span=200, adjust=False).mean()
             
-            # RSI
-            delta = df['close'].diff()
-            gain = delta.where(delta > 0, 0.0)
-            loss = (-delta).where(delta < 0, 0.0)
-            avg_gain = gain.ewm(span=14, adjust=False).mean()
-            avg_loss = loss.ewm(span=14, adjust=False).mean()
-            rs = avg_gain / avg_loss
+            # RSI（上昇幅・下落幅を2列にまとめ、平滑化を1回のewmで計算）
+            delta = close.diff().to_numpy()
+            moves = np.column_stack((
+                np.where(delta > 0, delta, 0.0),
+                np.where(delta < 0, -delta, 0.0)
+            ))
+            averages = pd.DataFrame(moves).ewm(span=14, adjust=False).mean().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = averages[:, 0] / averages[:, 1]
             df['rsi'] = 100 - (100 / (1 + rs))
         
         # 最新データ
-        latest = df_15m.iloc[-1]
-        prev = df_15m.iloc[-2]
-        latest_4h = df_4h.iloc[-1]
+        # 行Seriesは作らず、必要な列の末尾だけを配列で取り出して辞書にする
+        cols = ['open', 'high', 'low', 'close', 'ema_20', 'ema_200', 'rsi']
+        tail_15m = df_15m[cols].iloc[-2:].to_numpy()
+        latest = dict(zip(cols, tail_15m[-1]))
+        prev = dict(zip(cols, tail_15m[-2]))
+        latest_4h = dict(zip(cols, df_4h[cols].iloc[-1:].to_numpy()[0]))
         
         # トレンド判定
         main_uptrend = latest['close'] > latest['ema_200']
@@ -161,15 +290,15 @@ def check_signal(ticker: str) -> dict:
         
         if signal_type:
             # リスクリワード計算
-            recent = df_15m.tail(10)
             current_price = latest['close']
             
+            # 直近10本の安値・高値（欠損は無視）
             if signal_type == "buy":
-                stop_loss = recent['low'].min()
+                stop_loss = np.nanmin(df_15m['low'].to_numpy()[-10:])
                 risk = current_price - stop_loss
                 take_profit = current_price + (risk * 2)
             else:
-                stop_loss = recent['high'].max()
+                stop_loss = np.nanmax(df_15m['high'].to_numpy()[-10:])
                 risk = stop_loss - current_price
                 take_profit = current_price - (risk * 2)
             
@@ -195,36 +324,48 @@ def main():
     
     signals_found = 0
     
-    for ticker in WATCHLIST:
-        ticker = ticker.strip().upper()
-        if not ticker:
-            continue
-        
+    tickers = [t.strip().upper() for t in WATCHLIST if t.strip()]
+    
+    # 全銘柄のデータを時間足ごとに1回ずつまとめて取得（2つの時間足は並行して取得）
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_15m = executor.submit(fetch_watchlist_data, tickers, "5d", "15m")
+        future_1h = executor.submit(fetch_watchlist_data, tickers, "1mo", "1h")
+        data_15m = future_15m.result()
+        data_1h = future_1h.result()
+    
+    # シグナル判定は順に行い、通知内容だけを集める
+    notifications = []
+    for ticker in tickers:
         print(f"\n{ticker} をチェック中...")
-        result = check_signal(ticker)
+        result = check_signal(ticker, data_15m.get(ticker), data_1h.get(ticker))
         
         if result.get("signal"):
             signals_found += 1
-            message = f"トリガー: {result['trigger']}"
-            
             print(f"  → シグナル検出！ {result['signal'].upper()}")
-            
-            success = send_discord_notification(
+            notifications.append(dict(
                 ticker=ticker,
                 signal_type=result["signal"],
-                message=message,
+                message=f"トリガー: {result['trigger']}",
                 entry=result.get("entry"),
                 stop_loss=result.get("stop_loss"),
                 take_profit=result.get("take_profit")
-            )
-            
-            if success:
-                print(f"  → Discord通知送信完了")
-            else:
-                print(f"  → Discord通知送信失敗")
+            ))
         else:
             print(f"  → シグナルなし")
     
+    # 複数シグナルのDiscord通知は並行して送信（結果は銘柄順に表示）
+    if notifications:
+        with ThreadPoolExecutor(max_workers=DISCORD_MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(send_discord_notification, **notification)
+                for notification in notifications
+            ]
+            for notification, future in zip(notifications, futures):
+                if future.result():
+                    print(f"{notification['ticker']}: Discord通知送信完了")
+                else:
+                    print(f"{notification['ticker']}: Discord通知送信失敗")
+    
     print(f"\n=== 完了: {signals_found}件のシグナル検出 ===")
 
 
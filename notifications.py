@@ -5,10 +5,28 @@ Web画面アラート、ブラウザ通知、Webhook（LINE/Discord）対応
 import streamlit as st
 from typing import Optional
 from datetime import datetime
+from functools import lru_cache
 import requests
 import json
 
 
+# シグナル種別ごとの表示（色, 絵文字, 名称）。"buy" 以外は売り扱い
+_SIGNAL_META = {
+    "buy": (0x00FF00, "🟢", "買いシグナル"),
+    "sell": (0xFF0000, "🔴", "売りシグナル"),
+}
+
+
+@lru_cache(maxsize=1)
+def _get_http_session() -> requests.Session:
+    """
+    Webhook送信用の共有requests.Sessionを取得
+    
+    同じ送信先への2回目以降の通知でTCP/TLS接続を再利用する（初回呼び出し時に生成）
+    """
+    return requests.Session()
+
+
 class NotificationManager:
     """通知管理クラス"""
     
@@ -92,9 +110,7 @@ class WebhookNotifier:
         
         try:
             # Embed形式でリッチな通知を作成
-            color = 0x00FF00 if signal_type == "buy" else 0xFF0000  # 緑 or 赤
-            emoji = "🟢" if signal_type == "buy" else "🔴"
-            signal_name = "買いシグナル" if signal_type == "buy" else "売りシグナル"
+            color, emoji, signal_name = _SIGNAL_META.get(signal_type, _SIGNAL_META["sell"])
             
             embed = {
                 "title": f"{emoji} {ticker} - {signal_name}",
@@ -114,7 +130,7 @@ class WebhookNotifier:
             
             payload = {"embeds": [embed]}
             
-            response = requests.post(
+            response = _get_http_session().post(
                 self.discord_url,
                 json=payload,
                 headers={"Content-Type": "application/json"},
@@ -146,8 +162,7 @@ class WebhookNotifier:
             return False
         
         try:
-            emoji = "🟢" if signal_type == "buy" else "🔴"
-            signal_name = "買いシグナル" if signal_type == "buy" else "売りシグナル"
+            _, emoji, signal_name = _SIGNAL_META.get(signal_type, _SIGNAL_META["sell"])
             
             text = f"\n{emoji} {ticker} - {signal_name}\n{message}"
             
@@ -162,7 +177,7 @@ class WebhookNotifier:
             headers = {"Authorization": f"Bearer {self.line_token}"}
             payload = {"message": text}
             
-            response = requests.post(
+            response = _get_http_session().post(
                 "https://notify-api.line.me/api/notify",
                 headers=headers,
                 data=payload,
@@ -7,6 +7,12 @@ import numpy as np
 from typing import Tuple
 
 
+# パターン列のdtype（int8コード → ラベル文字列。コード0は "none"）
+# カテゴリ型なので1行1バイトで保持しつつ、従来どおり文字列と比較できる
+PIN_BAR_DTYPE = pd.CategoricalDtype(["none", "bullish_pin", "bearish_pin"])
+ENGULFING_DTYPE = pd.CategoricalDtype(["none", "bullish_engulfing", "bearish_engulfing"])
+
+
 def calculate_candle_metrics(row: pd.Series) -> dict:
     """
     ローソク足の各部分のサイズを計算
@@ -108,25 +114,54 @@ def detect_patterns(df: pd.DataFrame) -> pd.DataFrame:
     """
     DataFrameにパターン検出結果を追加
     
+    is_pin_bar / is_engulfing と同じ判定を全行に対して配列演算で一括実行する
+    
     Args:
         df: OHLCデータを含むDataFrame
     
     Returns:
         パターン列が追加されたDataFrame
     """
-    df = df.copy()
-    
-    # 初期化
-    df['pin_bar'] = "none"
-    df['engulfing'] = "none"
-    
-    for i in range(1, len(df)):
-        # ピンバー判定
-        is_pin, pin_type = is_pin_bar(df.iloc[i])
-        df.iloc[i, df.columns.get_loc('pin_bar')] = pin_type
+    n = len(df)
+    
+    open_price = df['open'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    
+    body = np.abs(close - open_price)
+    body_high = np.maximum(open_price, close)
+    body_low = np.minimum(open_price, close)
+    upper_wick = high - body_high
+    lower_wick = body_low - low
+    
+    # ピンバー判定（実体0の足は対象外）
+    has_body = body != 0
+    bullish_pin = has_body & (lower_wick >= body * 2.0) & (upper_wick < body * 0.5)
+    bearish_pin = has_body & (upper_wick >= body * 2.0) & (lower_wick < body * 0.5)
+    
+    # 判定結果はint8コードにまとめ、そのままカテゴリ列のコードとして使う
+    pin_code = np.where(bullish_pin, 1, np.where(bearish_pin, 2, 0)).astype(np.int8)
+    
+    # 包み足判定（1本前の足と比較）
+    engulfing_code = np.zeros(n, dtype=np.int8)
+    if n > 1:
+        prev_open, prev_close = open_price[:-1], close[:-1]
+        curr_open, curr_close = open_price[1:], close[1:]
+        covers = (body_low[1:] <= body_low[:-1]) & (body_high[1:] >= body_high[:-1])
         
-        # 包み足判定
-        is_eng, eng_type = is_engulfing(df.iloc[i], df.iloc[i-1])
-        df.iloc[i, df.columns.get_loc('engulfing')] = eng_type
-    
-    return df
+        bullish_engulfing = (prev_close < prev_open) & (curr_close > curr_open) & covers
+        bearish_engulfing = (prev_close > prev_open) & (curr_close < curr_open) & covers
+        
+        engulfing_code[1:] = np.where(bullish_engulfing, 1, np.where(bearish_engulfing, 2, 0))
+    
+    # 先頭行は従来どおり判定対象外
+    if n > 0:
+        pin_code[0] = 0
+    
+    # 元のDataFrameは変更せず、パターン列だけを追加した新しいDataFrameを返す
+    # （assignは浅いコピーなので、df.copy()のように全列を複製しない）
+    return df.assign(
+        pin_bar=pd.Categorical.from_codes(pin_code, dtype=PIN_BAR_DTYPE),
+        engulfing=pd.Categorical.from_codes(engulfing_code, dtype=ENGULFING_DTYPE)
+    )
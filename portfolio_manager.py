@@ -4,13 +4,21 @@
 """
 import streamlit as st
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+import numpy as np
+from typing import Dict, List, Optional
 from database import (
     get_funds, update_funds, get_portfolio, get_holding,
     add_or_update_holding, update_stop_loss, sell_holding, delete_holding,
     add_transaction
 )
-from data_fetcher import get_ticker_info, get_current_price
+from data_fetcher import get_ticker_names_batch, get_current_price, get_current_prices_batch
+
+
+# 含み損アラートの閾値（%）
+LOSS_ALERT_THRESHOLD_PCT = -2.0
+
+# 価格・損益付きポートフォリオのキャッシュTTL（秒、現在価格のキャッシュと揃える）
+PORTFOLIO_PRICES_CACHE_TTL_SECONDS = 60
 
 
 def calculate_position_size(
@@ -67,7 +75,7 @@ def calculate_max_shares(
     return (max_shares // unit) * unit
 
 
-def calculate_total_risk_exposure(portfolio_data: List[Dict]) -> Tuple[float, float]:
+def calculate_total_risk_exposure(portfolio_data: List[Dict]) -> float:
     """
     ポートフォリオ全体のリスク額を計算
     
@@ -75,80 +83,127 @@ def calculate_total_risk_exposure(portfolio_data: List[Dict]) -> Tuple[float, fl
         portfolio_data: ポートフォリオデータ（現在価格含む）
     
     Returns:
-        (リスク額, リスク率)
+        リスク額（損切り価格・現在価格がある銘柄の、損切りまでの下落幅 × 株数の合計）
+    """
+    # 損切り価格・現在価格・株数を配列で取り出し（未設定はNoneを0として扱う）
+    n = len(portfolio_data)
+    stop_loss = np.fromiter((h.get('stop_loss') or 0.0 for h in portfolio_data), dtype=np.float64, count=n)
+    current_price = np.fromiter((h.get('current_price') or 0.0 for h in portfolio_data), dtype=np.float64, count=n)
+    quantity = np.fromiter((h['quantity'] for h in portfolio_data), dtype=np.float64, count=n)
+    
+    # 両方が設定済みで、現在価格が損切り価格を上回る銘柄のみ集計
+    risk_per_share = np.where((stop_loss != 0) & (current_price != 0), current_price - stop_loss, 0.0)
+    return float((np.maximum(risk_per_share, 0.0) * quantity).sum())
+
+
+def compute_loss_alerts(portfolio: List[Dict], threshold: float = LOSS_ALERT_THRESHOLD_PCT) -> List[Dict]:
     """
-    total_risk = 0.0
+    含み損アラート対象の銘柄を抽出
     
-    for holding in portfolio_data:
-        if holding.get('stop_loss') and holding.get('current_price'):
-            risk_per_share = holding['current_price'] - holding['stop_loss']
-            if risk_per_share > 0:
-                risk = risk_per_share * holding['quantity']
-                total_risk += risk
+    Args:
+        portfolio: 損益計算済みのポートフォリオデータ
+        threshold: アラート閾値（%）
+    
+    Returns:
+        [{'ticker', 'name', 'pnl_pct'}] のリスト
+    """
+    if not portfolio:
+        return []
     
-    return total_risk
+    df = pd.DataFrame.from_records(portfolio, columns=['ticker', 'name', 'unrealized_pnl_pct'])
+    mask = df['unrealized_pnl_pct'].fillna(0) <= threshold
+    return df.loc[mask].rename(columns={'unrealized_pnl_pct': 'pnl_pct'}).to_dict('records')
 
 
 def get_portfolio_with_prices() -> List[Dict]:
     """
     ポートフォリオに現在価格と損益を追加して取得（キャッシュ利用）
     """
-    portfolio = get_portfolio()
-    loss_alerts = []  # 損失アラート用
-    
-    for holding in portfolio:
-        ticker = holding['ticker']
-        
-        # get_ticker_infoから名前と価格の両方を取得（APIコール削減）
-        info = get_ticker_info(ticker)
-        holding['name'] = info.get('name', ticker)
-        current_price = info.get('current_price')
-        
-        if current_price:
-            holding['current_price'] = current_price
-            holding['market_value'] = current_price * holding['quantity']
-            holding['cost_basis'] = holding['avg_cost'] * holding['quantity']
-            holding['unrealized_pnl'] = holding['market_value'] - holding['cost_basis']
-            holding['unrealized_pnl_pct'] = (
-                (holding['unrealized_pnl'] / holding['cost_basis']) * 100
-                if holding['cost_basis'] > 0 else 0
-            )
-            
-            # 損切りまでの距離
-            if holding.get('stop_loss'):
-                holding['distance_to_sl'] = current_price - holding['stop_loss']
-                holding['distance_to_sl_pct'] = (
-                    (holding['distance_to_sl'] / current_price) * 100
-                    if current_price > 0 else 0
-                )
-            
-            # === 含み損-2%アラート ===
-            if holding['unrealized_pnl_pct'] <= -2.0:
-                holding['loss_alert'] = True
-                loss_alerts.append({
-                    'ticker': ticker,
-                    'name': holding['name'],
-                    'pnl_pct': holding['unrealized_pnl_pct']
-                })
-            else:
-                holding['loss_alert'] = False
-        else:
-            holding['current_price'] = None
-            holding['market_value'] = 0
-            holding['unrealized_pnl'] = 0
-            holding['loss_alert'] = False
+    # 保有内容そのものをキーにするため、売買・損切り変更後は自動的に再計算される
+    holdings = tuple(tuple(h.items()) for h in get_portfolio())
+    portfolio = _enrich_portfolio_with_prices(holdings)
     
     # セッションに損失アラートを保存
+    loss_alerts = compute_loss_alerts(portfolio)
     if loss_alerts:
         st.session_state.loss_alerts = loss_alerts
     
     return portfolio
 
 
+@st.cache_data(ttl=PORTFOLIO_PRICES_CACHE_TTL_SECONDS, show_spinner=False)
+def _enrich_portfolio_with_prices(holdings: tuple) -> List[Dict]:
+    """
+    保有銘柄に現在価格と損益を追加
+    
+    1回の再実行で複数のUIから呼ばれても、TTL内は計算済みの結果を返す
+    
+    Args:
+        holdings: 保有銘柄の (キー, 値) タプルのタプル（キャッシュのためタプルを使用）
+    
+    Returns:
+        現在価格・損益を追加した保有銘柄リスト
+    """
+    if not holdings:
+        return []
+    df = pd.DataFrame.from_records([dict(h) for h in holdings])
+    
+    # 全銘柄の現在価格を1回のリクエストで取得（APIコール削減）し、銘柄名は並列に取得
+    tickers = tuple(df['ticker'])
+    prices = get_current_prices_batch(tickers)
+    names = get_ticker_names_batch(tickers)
+    
+    # 一括取得で漏れた銘柄のみ個別取得にフォールバック（取得できなければNaN）
+    current_price = np.array(
+        [prices.get(t) or get_current_price(t) or np.nan for t in tickers],
+        dtype=np.float64
+    )
+    has_price = ~np.isnan(current_price)
+    quantity = df['quantity'].to_numpy(dtype=np.float64)
+    avg_cost = df['avg_cost'].to_numpy(dtype=np.float64)
+    stop_loss = df['stop_loss'].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # 評価額・損益は列単位でまとめて計算（価格が取れない銘柄は0）
+    market_value = np.where(has_price, current_price * quantity, 0.0)
+    cost_basis = avg_cost * quantity
+    unrealized_pnl = np.where(has_price, market_value - cost_basis, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unrealized_pnl_pct = np.where(has_price & (cost_basis > 0), unrealized_pnl / cost_basis * 100, 0.0)
+        
+        # 損切りまでの距離（損切り価格が設定済みの銘柄のみ）
+        has_sl = has_price & (np.nan_to_num(stop_loss) != 0)
+        distance_to_sl = np.where(has_sl, current_price - stop_loss, np.nan)
+        distance_to_sl_pct = np.where(has_sl, distance_to_sl / current_price * 100, np.nan)
+    
+    df = df.assign(
+        name=df['ticker'].map(names),
+        # 通貨区分はここで1回だけ判定し、集計側はフラグを読むだけにする
+        is_usd=(df['currency'] == 'USD') | ~df['ticker'].str.endswith('.T'),
+        current_price=current_price,
+        market_value=market_value,
+        cost_basis=cost_basis,
+        unrealized_pnl=unrealized_pnl,
+        unrealized_pnl_pct=unrealized_pnl_pct,
+        distance_to_sl=distance_to_sl,
+        distance_to_sl_pct=distance_to_sl_pct,
+        # === 含み損-2%アラート ===
+        loss_alert=has_price & (unrealized_pnl_pct <= LOSS_ALERT_THRESHOLD_PCT)
+    )
+    
+    # 呼び出し側は従来どおり辞書のリストを使うため、NaNはNoneにしてPython型で返す
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+
 def calculate_total_assets(cash_jpy: float, cash_usd: float, portfolio: List[Dict]) -> Dict:
     """
     総資産を計算
     
+    Args:
+        cash_jpy: 円現金
+        cash_usd: ドル現金
+        portfolio: get_portfolio_with_prices で取得したポートフォリオ（is_usd 付き）
+    
     Returns:
         {
             'cash_jpy': 円現金,
@@ -160,20 +215,18 @@ def calculate_total_assets(cash_jpy: float, cash_usd: float, portfolio: List[Dic
             'total_pnl': 含み損益合計
         }
     """
-    holdings_jpy = 0.0
-    holdings_usd = 0.0
-    total_pnl = 0.0
-    
-    for h in portfolio:
-        value = h.get('market_value', 0)
-        pnl = h.get('unrealized_pnl', 0)
-        
-        if h.get('currency') == 'USD' or not h['ticker'].endswith('.T'):
-            holdings_usd += value
-        else:
-            holdings_jpy += value
-        
-        total_pnl += pnl
+    # 株数・現在価格・損益・ドル建てフラグを配列として1回だけ取り出し、集計はNumPyで行う
+    # （価格が取れない銘柄は評価額0として扱う）
+    n = len(portfolio)
+    quantities = np.fromiter((h['quantity'] for h in portfolio), dtype=np.float64, count=n)
+    prices = np.fromiter((h.get('current_price') or 0.0 for h in portfolio), dtype=np.float64, count=n)
+    pnls = np.fromiter((h.get('unrealized_pnl', 0) for h in portfolio), dtype=np.float64, count=n)
+    is_usd = np.fromiter((h['is_usd'] for h in portfolio), dtype=bool, count=n)
+    
+    # 評価額合計は 株数・価格 の内積（評価額の中間配列を作らない）
+    holdings_usd = float(np.vdot(quantities[is_usd], prices[is_usd]))
+    holdings_jpy = float(np.vdot(quantities[~is_usd], prices[~is_usd]))
+    total_pnl = float(pnls.sum())
     
     return {
         'cash_jpy': cash_jpy,
@@ -418,13 +471,28 @@ def render_portfolio_table(portfolio: List[Dict]):
                     st.rerun()
 
 
-def render_position_calculator(ticker: str, current_price: float, stop_loss_suggestion: float = None):
-    """ポジションサイズ計算機"""
+def render_position_calculator(
+    ticker: str,
+    current_price: float,
+    stop_loss_suggestion: float = None,
+    assets: Optional[Dict] = None
+):
+    """
+    ポジションサイズ計算機
+    
+    Args:
+        ticker: 銘柄コード
+        current_price: 現在価格
+        stop_loss_suggestion: 損切り価格の初期値
+        assets: render_asset_summary で計算済みの総資産（Noneならここで計算）
+    """
     st.subheader("🧮 購入シミュレーター")
     
-    funds = get_funds()
-    portfolio = get_portfolio_with_prices()
-    assets = calculate_total_assets(funds.get('JPY', 0), funds.get('USD', 0), portfolio)
+    # 呼び出し元で計算済みなら再取得しない（入力変更のたびの再計算を避ける）
+    if assets is None:
+        funds = get_funds()
+        portfolio = get_portfolio_with_prices()
+        assets = calculate_total_assets(funds.get('JPY', 0), funds.get('USD', 0), portfolio)
     
     # 通貨判定（かぶミニ対応: 日本株も1株単位）
     is_jpy = ticker.endswith('.T')
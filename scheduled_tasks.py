@@ -3,11 +3,16 @@
 朝8:00と15:15に自動的にスキャンと通知を実行
 """
 import streamlit as st
+import heapq
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import time
 
 
+# Gemini API呼び出しの最小間隔（秒、無料枠のレート制限に余裕を持たせる）
+AI_REQUEST_INTERVAL_SECONDS = 12
+
+
 def should_run_morning_scan() -> bool:
     """朝8:00のスキャンを実行すべきかチェック"""
     now = datetime.now()
@@ -55,38 +60,49 @@ def run_scheduled_portfolio_scan():
     from sell_advisor import analyze_portfolio_sell_signals
     from portfolio_manager import get_portfolio_with_prices
     from signals import generate_signal, SignalType
-    from data_fetcher import fetch_stock_data
+    from data_fetcher import fetch_stock_data_batch
     from indicators import add_indicators
     from notifications import get_webhook_notifier
     
     portfolio = get_portfolio_with_prices()
     alerts = []
+    failures = []  # データ取得・判定に失敗した銘柄
+    
+    # 全銘柄の15分足を1回のリクエストでまとめて取得
+    data = fetch_stock_data_batch(tuple(h['ticker'] for h in portfolio), interval="15m", period="5d")
     
     for holding in portfolio:
         ticker = holding['ticker']
+        df = data.get(ticker)
+        if df is None or len(df) == 0:
+            failures.append(ticker)
+            continue
+        
         try:
-            df = fetch_stock_data(ticker, period="5d", interval="15m")
-            if df is not None and len(df) > 0:
-                df = add_indicators(df)
-                signal_result = generate_signal(df, df)  # 簡易版
-                
-                if signal_result['signal'] != SignalType.NONE:
-                    alerts.append({
-                        'ticker': ticker,
-                        'name': holding.get('name', ticker),
-                        'signal': signal_result['signal'],
-                        'trigger': signal_result.get('trigger', '')
-                    })
-        except:
+            df = add_indicators(df)
+            signal_result = generate_signal(df, df)  # 簡易版
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"Scheduled portfolio scan error ({ticker}): {e}")
+            failures.append(ticker)
             continue
+        
+        if signal_result['signal'] != SignalType.NONE:
+            alerts.append({
+                'ticker': ticker,
+                'name': holding.get('name', ticker),
+                'signal': signal_result['signal'],
+                'trigger': signal_result.get('trigger', '')
+            })
     
-    # 通知送信
-    if alerts:
+    # 通知送信（シグナルがなくても取得失敗があれば知らせる）
+    if alerts or failures:
         notifier = get_webhook_notifier()
         message_lines = ["📊 **保有銘柄シグナル**\n"]
         for a in alerts:
             icon = "🟢" if "買い" in a['signal'] else "🔴"
             message_lines.append(f"{icon} {a['ticker']} ({a['name']}): {a['signal']}")
+        if failures:
+            message_lines.append(f"⚠️ 取得失敗: {len(failures)}件 ({', '.join(failures)})")
         
         notifier.send_all(
             ticker="PORTFOLIO",
@@ -120,29 +136,36 @@ def run_scheduled_screener_scan(use_ai: bool = False) -> List[Dict]:
     # 買いシグナル銘柄のみ抽出
     buy_signals = [r for r in results if r.get('signal') == '買い']
     
-    # スコア順にソート
-    buy_signals = sorted(buy_signals, key=lambda x: x.get('base_score', 0), reverse=True)
-    
-    # トップ2を取得
-    top2 = buy_signals[:2]
+    # スコア上位2件を取得（全件ソートせずに上位だけ選ぶ）
+    top2 = heapq.nlargest(2, buy_signals, key=lambda x: x.get('base_score', 0))
     
     # AI分析（オプション）
     if use_ai and top2:
         try:
-            from sentiment import SentimentAnalyzer
-            analyzer = SentimentAnalyzer()
+            from sentiment import get_sentiment_analyzer
+            analyzer = get_sentiment_analyzer()
             
+            # ニュース取得はGeminiのレート制限と無関係なので、全銘柄分を並列に先に取得
+            news_by_ticker = analyzer.get_news_many([s['ticker'] for s in top2])
+            
+            # API制限対策: Gemini呼び出しの間だけ間隔を空ける（最後の呼び出し後は待たない）
+            last_request = None
             for stock in top2:
-                ticker = stock['ticker']
-                news = analyzer.get_news(ticker)
-                if news:
-                    score, reason = analyzer.analyze_news(ticker, news[0].get('title', ''))
-                    stock['ai_score'] = score
-                    stock['ai_reason'] = reason
-                    # 統合スコア計算
-                    tech_score = stock.get('tech_score', 50)
-                    stock['total_score'] = (tech_score * 0.7) + (score * 0.3) + stock.get('price_bonus', 0)
-                time.sleep(12)  # API制限対策 (無料枠は余裕を持って待機)
+                news = news_by_ticker[stock['ticker']]
+                if not news:
+                    continue
+                if last_request is not None:
+                    wait = AI_REQUEST_INTERVAL_SECONDS - (time.monotonic() - last_request)
+                    if wait > 0:
+                        time.sleep(wait)
+                last_request = time.monotonic()
+                
+                score, reason = analyzer.analyze_news(stock['ticker'], news[0].get('title', ''))
+                stock['ai_score'] = score
+                stock['ai_reason'] = reason
+                # 統合スコア計算
+                tech_score = stock.get('tech_score', 50)
+                stock['total_score'] = (tech_score * 0.7) + (score * 0.3) + stock.get('price_bonus', 0)
         except Exception as e:
             # エラー発生時も続行
             print(f"Scheduled AI analysis error: {e}")
@@ -170,7 +193,7 @@ def run_scheduled_screener_scan(use_ai: bool = False) -> List[Dict]:
             message="\n".join(message_lines)
         )
     
-    return top3
+    return top2
 
 
 def check_and_run_scheduled_tasks():
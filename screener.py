@@ -227,6 +227,15 @@ RAKUTEN_MINI_STOCKS = [
 ]
 
 
+# 全銘柄テーブルの表示カラムと表示名
+RESULT_TABLE_COLUMNS = ['rank', 'ticker', 'name', 'price', 'tech_score', 'price_bonus', 'base_score', 'rsi', 'trend']
+RESULT_TABLE_RENAME = {
+    'rank': 'ランク', 'ticker': 'コード', 'name': '銘柄名', 
+    'price': '株価', 'tech_score': 'テクニカル', 'price_bonus': '価格ボーナス',
+    'base_score': '総合スコア', 'rsi': 'RSI', 'trend': 'トレンド'
+}
+
+
 @st.cache_data(ttl=300)  # 5分キャッシュ
 def get_stock_data_for_screening(ticker: str) -> Optional[Dict]:
     """
@@ -737,17 +746,20 @@ def render_screener_page():
                 # AI分析結果がなければ自動実行
                 if 'top2_ai_results' not in st.session_state or st.session_state.get('top2_ai_tickers') != [s['ticker'] for s in top2]:
                     try:
-                        from sentiment import SentimentAnalyzer
-                        analyzer = SentimentAnalyzer()
+                        from sentiment import get_sentiment_analyzer
+                        analyzer = get_sentiment_analyzer()
                         
                         with st.spinner("🤖 おすすめトップ2銘柄をAI詳細分析中..."):
                             ai_results = []
                             progress_bar = st.progress(0)
                             
+                            # ニュースは全銘柄分を並列に先に取得
+                            news_by_ticker = analyzer.get_news_many([s['ticker'] for s in top2])
+                            
                             for i, stock in enumerate(top2):
                                 ticker = stock['ticker']
                                 try:
-                                    news = analyzer.get_news(ticker)
+                                    news = news_by_ticker[ticker]
                                     if news:
                                         score, reason = analyzer.analyze_news(ticker, news[0].get('title', ''))
                                         stock['ai_score'] = score
@@ -829,19 +841,9 @@ def render_screener_page():
         with tab3:
             if results:
                 st.caption("※ テクニカルスコア順（高いほど推奨）")
-                df = pd.DataFrame(results)
-                # 必要なカラムのみ抽出（存在確認）
-                cols = ['rank', 'ticker', 'name', 'price', 'tech_score', 'price_bonus', 'base_score', 'rsi', 'trend']
-                available_cols = [c for c in cols if c in df.columns]
-                df = df[available_cols]
-                
-                # カラム名変更
-                col_map = {
-                    'rank': 'ランク', 'ticker': 'コード', 'name': '銘柄名', 
-                    'price': '株価', 'tech_score': 'テクニカル', 'price_bonus': '価格ボーナス',
-                    'base_score': '総合スコア', 'rsi': 'RSI', 'trend': 'トレンド'
-                }
-                df = df.rename(columns=col_map)
+                # 必要なカラムだけで直接DataFrameを構築し、カラム名を変更
+                df = pd.DataFrame.from_records(results, columns=RESULT_TABLE_COLUMNS)
+                df = df.rename(columns=RESULT_TABLE_RENAME)
                 
                 # フォーマット
                 if '株価' in df.columns:
@@ -863,10 +865,10 @@ def render_screener_page():
             
             if st.button("🔬 AI分析を実行", type="secondary"):
                 try:
-                    from sentiment import SentimentAnalyzer
+                    from sentiment import get_sentiment_analyzer
                     from ml_engine import StockPredictor
                     
-                    analyzer = SentimentAnalyzer()
+                    analyzer = get_sentiment_analyzer()
                     predictor = StockPredictor()
                     
                     if not analyzer.is_available():
@@ -875,13 +877,20 @@ def render_screener_page():
                         progress = st.progress(0)
                         ai_results = []
                         
+                        # 当日分析済みでない銘柄のニュースだけを並列に先に取得
+                        news_by_ticker = analyzer.get_news_many([
+                            s['ticker'] for s in top_picks
+                            if not analyzer.has_cached_sentiment(s['ticker'])
+                        ])
+                        
                         for i, stock in enumerate(top_picks):
                             ticker = stock['ticker']
                             progress.progress((i + 1) / len(top_picks))
                             st.text(f"分析中: {ticker}... ({i+1}/{len(top_picks)})")
                             
                             # 感情分析
-                            score, summary, _ = analyzer.get_sentiment(ticker)
+                            # 分析済みの銘柄はキャッシュから返る（news_list=Noneでも再取得しない）
+                            score, summary, _ = analyzer.get_sentiment(ticker, news_by_ticker.get(ticker))
                             
                             # ML予測（シンプル版）
                             pred = predictor._simple_prediction(
@@ -10,13 +10,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
-from data_fetcher import fetch_stock_data, get_ticker_info
+from data_fetcher import fetch_stock_data, get_ticker_info, CACHE_TTL_SECONDS
 from indicators import calculate_ema, calculate_rsi
 
 
+# 保有銘柄の売却判定を並列実行するスレッド数（株価取得の待ち時間を重ねる）
+SELL_ANALYSIS_MAX_WORKERS = 10
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
 def calculate_sell_score(
     ticker: str,
     entry_price: float,
@@ -27,6 +33,8 @@ def calculate_sell_score(
     """
     売却スコアを算出（0-100点、高いほど売り推奨）
     
+    株価データ（fetch_stock_data）と同じTTLでキャッシュし、データが同じ間は再計算しない
+    
     Args:
         ticker: 銘柄コード
         entry_price: 取得単価
@@ -73,17 +81,21 @@ def calculate_sell_score(
                 result['reasons'].append("データ不足")
                 return result
         
-        # インジケーター計算
-        df = calculate_ema(df, period=20)
-        df = calculate_ema(df, period=200)
-        df = calculate_rsi(df, period=14)
+        # インジケーター計算（判定に使う値はndarrayから直近2本分だけ取り出す）
+        # OHLCは1回のto_numpyで2次元配列として取り出し、列ビューで参照する
+        ohlc = df[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)
+        open_, high, low, close = ohlc.T
+        ema_20 = calculate_ema(df['close'], period=20).to_numpy()
+        rsi = calculate_rsi(df['close'], period=14).to_numpy()
         
-        latest = df.iloc[-1]
-        prev = df.iloc[-2] if len(df) > 1 else latest
-        current_price = latest['close']
+        current_price = float(close[-1])
+        latest_open, latest_high, latest_low = float(open_[-1]), float(high[-1]), float(low[-1])
+        prev_close, prev_open = float(close[-2]), float(open_[-2])
+        latest_ema20, prev_ema20 = float(ema_20[-1]), float(ema_20[-2])
+        latest_rsi, prev_rsi = float(rsi[-1]), float(rsi[-2])
         
         result['details']['current_price'] = current_price
-        result['details']['rsi'] = latest['rsi']
+        result['details']['rsi'] = latest_rsi
         
         score = 0
         
@@ -102,7 +114,7 @@ def calculate_sell_score(
         
         # 2. トレイリングストップ（最高値から5%下落）
         if len(df) >= 5:
-            recent_high = df['high'].tail(20).max()
+            recent_high = float(high[-20:].max())
             drop_from_high = (recent_high - current_price) / recent_high * 100
             if drop_from_high >= 5 and current_price > entry_price:
                 score += 40
@@ -110,23 +122,17 @@ def calculate_sell_score(
                 result['details']['drop_from_high'] = drop_from_high
         
         # 3. トレンド転換 (Death Cross)
-        if 'ema_20' in df.columns and 'ema_200' in df.columns:
-            if 'ema_20' in latest.index:
-                prev_ema20 = prev['ema_20'] if 'ema_20' in prev.index else latest['ema_20']
-                ema_20_slope = latest['ema_20'] - prev_ema20
-                if current_price < latest['ema_20'] and ema_20_slope < 0:
-                    score += 30
-                    result['reasons'].append("📊 トレンド転換シグナル（価格<20EMA、EMA下向き）")
+        ema_20_slope = latest_ema20 - prev_ema20
+        if current_price < latest_ema20 and ema_20_slope < 0:
+            score += 30
+            result['reasons'].append("📊 トレンド転換シグナル（価格<20EMA、EMA下向き）")
         
         # ============================================
         # B. テクニカル過熱感・反転シグナル (Max 50点)
         # ============================================
         
         # 1. RSIピークアウト（70超えから下落）
-        latest_rsi = latest.get('rsi') if hasattr(latest, 'get') else latest['rsi'] if 'rsi' in latest.index else None
-        prev_rsi = prev.get('rsi') if hasattr(prev, 'get') else prev['rsi'] if 'rsi' in prev.index else None
-        
-        if latest_rsi is not None and prev_rsi is not None and not pd.isna(latest_rsi) and not pd.isna(prev_rsi):
+        if not np.isnan(latest_rsi) and not np.isnan(prev_rsi):
             if prev_rsi > 70 and latest_rsi <= 70:
                 score += 30
                 result['reasons'].append(f"⚡ RSIピークアウト ({prev_rsi:.1f}→{latest_rsi:.1f})")
@@ -135,10 +141,10 @@ def calculate_sell_score(
                 result['reasons'].append(f"🔥 RSI過熱 ({latest_rsi:.1f})")
         
         # 2. 反転ローソク足パターン
-        body = abs(latest['close'] - latest['open'])
-        upper_wick = latest['high'] - max(latest['open'], latest['close'])
-        lower_wick = min(latest['open'], latest['close']) - latest['low']
-        total_range = latest['high'] - latest['low']
+        body = abs(current_price - latest_open)
+        upper_wick = latest_high - max(latest_open, current_price)
+        lower_wick = min(latest_open, current_price) - latest_low
+        total_range = latest_high - latest_low
         
         if total_range > 0:
             # 長い上ヒゲ（高値圏での売り圧力）
@@ -147,13 +153,12 @@ def calculate_sell_score(
                 result['reasons'].append("🕯️ 長い上ヒゲ出現（売り圧力）")
             
             # 陰線の包み足
-            if len(df) > 1:
-                prev_body = prev['close'] - prev['open']
-                curr_body = latest['close'] - latest['open']
-                if prev_body > 0 and curr_body < 0:
-                    if abs(curr_body) > abs(prev_body):
-                        score += 15
-                        result['reasons'].append("🕯️ 陰線包み足（反転シグナル）")
+            prev_body = prev_close - prev_open
+            curr_body = current_price - latest_open
+            if prev_body > 0 and curr_body < 0:
+                if abs(curr_body) > abs(prev_body):
+                    score += 15
+                    result['reasons'].append("🕯️ 陰線包み足（反転シグナル）")
         
         # ============================================
         # C. 含み損益に基づく調整
@@ -193,6 +198,38 @@ def calculate_sell_score(
     return result
 
 
+def _analyze_holding(holding: Dict) -> Dict:
+    """
+    保有銘柄1件の売却判定を実行し、保有情報を付加する
+    
+    Args:
+        holding: 保有銘柄（avg_cost > 0）
+    
+    Returns:
+        売却判定結果
+    """
+    ticker = holding['ticker']
+    entry_price = holding.get('avg_cost', 0)
+    stop_loss = holding.get('stop_loss', 0)
+    quantity = holding.get('quantity', 0)
+    
+    sell_result = calculate_sell_score(
+        ticker=ticker,
+        entry_price=entry_price,
+        stop_loss=stop_loss,
+        quantity=quantity,
+        current_price_from_portfolio=holding.get('current_price')  # ポートフォリオから取得
+    )
+    
+    # 保有情報を追加
+    sell_result['name'] = holding.get('name', ticker)
+    sell_result['quantity'] = quantity
+    sell_result['entry_price'] = entry_price
+    sell_result['stop_loss'] = stop_loss
+    
+    return sell_result
+
+
 def analyze_portfolio_sell_signals(portfolio: List[Dict]) -> List[Dict]:
     """
     ポートフォリオ全体の売却判定を実行
@@ -203,33 +240,15 @@ def analyze_portfolio_sell_signals(portfolio: List[Dict]) -> List[Dict]:
     Returns:
         売却判定結果リスト
     """
-    results = []
+    # 取得単価のある銘柄のみ対象
+    holdings = [h for h in portfolio if h.get('avg_cost', 0) > 0]
+    if not holdings:
+        return []
     
-    for holding in portfolio:
-        ticker = holding['ticker']
-        entry_price = holding.get('avg_cost', 0)
-        stop_loss = holding.get('stop_loss', 0)
-        quantity = holding.get('quantity', 0)
-        current_price = holding.get('current_price')  # ポートフォリオから取得
-        
-        if entry_price <= 0:
-            continue
-        
-        sell_result = calculate_sell_score(
-            ticker=ticker,
-            entry_price=entry_price,
-            stop_loss=stop_loss,
-            quantity=quantity,
-            current_price_from_portfolio=current_price
-        )
-        
-        # 保有情報を追加
-        sell_result['name'] = holding.get('name', ticker)
-        sell_result['quantity'] = quantity
-        sell_result['entry_price'] = entry_price
-        sell_result['stop_loss'] = stop_loss
-        
-        results.append(sell_result)
+    # 各銘柄の判定は株価取得待ちが大半なので、スレッドで並列実行
+    max_workers = min(SELL_ANALYSIS_MAX_WORKERS, len(holdings))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_analyze_holding, holdings))
     
     # 売却スコア順にソート（危険度高い順）
     results = sorted(results, key=lambda x: x['sell_score'], reverse=True)
@@ -4,15 +4,243 @@ Gemini APIを使用してニュースのポジティブ/ネガティブ判定を
 """
 import streamlit as st
 import yfinance as yf
+import requests
 from datetime import datetime, date
 from typing import Tuple, Optional, List, Dict
 import json
 import os
+import re
+import hashlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+
+# ニュースごとのGemini呼び出しの同時実行数
+NEWS_ANALYSIS_MAX_WORKERS = 5
+# 複数銘柄のニュース取得の同時実行数
+NEWS_FETCH_MAX_WORKERS = 10
+
+# Gemini呼び出しペースの上限・下限（1分あたりのリクエスト数、上限は無料枠の15 RPM）
+GEMINI_MAX_RPM = 15
+GEMINI_MIN_RPM = 1
+# 待たずに連続送信できる回数（1銘柄分のニュースはまとめて送れるようにする）
+GEMINI_BURST = NEWS_ANALYSIS_MAX_WORKERS
+
+# Gemini応答の後処理に使う正規表現（呼び出しごとにコンパイルしない）
+_JSON_FENCE_RE = re.compile(r"```(?:json)?")
+_NUM_RE = re.compile(r"\d+")
+
+# プロンプトに含めるニュース本文の上限（文字数とUTF-8のバイト数の両方で制限）
+NEWS_TEXT_MAX_CHARS = 2000
+NEWS_TEXT_MAX_BYTES = 6000
+
+# 分析プロンプトのテンプレート（固定部分は呼び出しごとに組み立てない）
+_NEWS_PROMPT_TEMPLATE = """
+あなたはプロの証券アナリストです。以下のニュースを読み、
+対象銘柄({ticker})の株価にとってポジティブかネガティブかを判定してください。
+
+出力ルール:
+- 0(超悲観)〜100(超楽観)、50を中立とする整数スコア
+- 短い理由（日本語で1-2文）
+
+ニュース:
+{news}
+
+出力フォーマット(JSON):
+{{"score": 整数, "reason": "理由の文字列"}}
+"""
+
+_NEWS_BATCH_PROMPT_TEMPLATE = """
+あなたはプロの証券アナリストです。以下の番号付きニュースをそれぞれ読み、
+対象銘柄({ticker})の株価にとってポジティブかネガティブかを判定してください。
+
+出力ルール:
+- ニュースごとに 0(超悲観)〜100(超楽観)、50を中立とする整数スコア
+- 短い理由（日本語で1-2文）
+- id はニュースの番号
+
+ニュース:
+{items}
+
+出力フォーマット(JSON):
+{{"results": [{{"id": 番号, "score": 整数, "reason": "理由の文字列"}}, ...]}}
+"""
+
+
+class _RateController:
+    """
+    Gemini呼び出しの送信ペースを全銘柄・全スレッドで共有して調整（トークンバケット + AIMD）
+    
+    トークンは毎分 rpm 個ずつ（最大 burst 個まで）貯まり、送信ごとに1個使う。
+    429（レート制限）を受けたらレートを半分に下げて貯まったトークンを捨て、
+    成功するたびにレートを1 RPMずつ戻す
+    """
+    
+    def __init__(self, max_rpm: float = GEMINI_MAX_RPM, min_rpm: float = GEMINI_MIN_RPM,
+                 burst: int = GEMINI_BURST):
+        self.max_rpm = max_rpm
+        self.min_rpm = min_rpm
+        self.burst = burst
+        self.rpm = max_rpm
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        """経過時間分のトークンを補充（ロック取得中に呼ぶ）"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rpm / 60.0)
+        self._updated = now
+    
+    def acquire(self):
+        """トークンを1個予約し、使えるようになるまで待機"""
+        with self._lock:
+            self._refill(time.monotonic())
+            # 不足分はマイナス残高として予約し、後続の呼び出しはさらに後ろで待つ
+            self._tokens -= 1
+            wait = -self._tokens * 60.0 / self.rpm if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+    
+    def on_success(self):
+        """成功時: レートを1 RPMずつ回復（加算的増加）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rpm = min(self.max_rpm, self.rpm + 1)
+    
+    def on_rate_limited(self):
+        """429受信時: レートを半減（乗算的減少）し、連続送信を止める"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rpm = max(self.min_rpm, self.rpm * 0.5)
+            self._tokens = min(self._tokens, 0.0)
+
+
+# 全SentimentAnalyzerで共有する送信ペース
+_gemini_rate = _RateController()
+
+# ニュース分析結果の永続キャッシュ（同じニュースはGeminiに再送しない）
+SENTIMENT_CACHE_PATH = Path(__file__).parent / ".data" / "sentiment_cache.db"
+# 分析結果の保持日数（これより古い結果は接続時に削除）
+SENTIMENT_CACHE_RETENTION_DAYS = 30
+_sentiment_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _get_http_session() -> requests.Session:
+    """
+    ニュースRSS取得用の共有requests.Sessionを取得
+    
+    2回目以降の取得でTCP/TLS接続を再利用する（get_news_many の並列取得分の接続を保持）
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=NEWS_FETCH_MAX_WORKERS)
+    session.mount("https://", adapter)
+    return session
+
+
+def _strip_code_fence(text: str) -> str:
+    """Geminiの応答からMarkdownのコードフェンスを除去"""
+    return _JSON_FENCE_RE.sub("", text).strip()
+
+
+@lru_cache(maxsize=1)
+def _get_sentiment_cache() -> Optional[sqlite3.Connection]:
+    """分析結果キャッシュのsqlite接続を取得（作成できなければNone）"""
+    try:
+        SENTIMENT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(SENTIMENT_CACHE_PATH), check_same_thread=False)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS news_sentiment "
+                "(key TEXT PRIMARY KEY, score INTEGER, reason TEXT, ts INTEGER)"
+            )
+            # 保持期間を過ぎた結果を削除（ファイルが増え続けないようにする）
+            cutoff = int(time.time()) - SENTIMENT_CACHE_RETENTION_DAYS * 86400
+            conn.execute("DELETE FROM news_sentiment WHERE ts < ?", (cutoff,))
+        return conn
+    except Exception as e:
+        print(f"Sentiment cache unavailable: {e}")
+        return None
+
+
+def _truncate_news_text(news_text: str) -> str:
+    """ニュース本文をプロンプト用の上限（文字数・バイト数）に収まるよう切り詰め"""
+    if len(news_text) > NEWS_TEXT_MAX_CHARS:
+        news_text = news_text[:NEWS_TEXT_MAX_CHARS]
+    # 1文字が最大4バイトなので、文字数が上限の1/4以下ならバイト数の確認は不要
+    if len(news_text) * 4 <= NEWS_TEXT_MAX_BYTES:
+        return news_text
+    encoded = news_text.encode("utf-8")
+    if len(encoded) <= NEWS_TEXT_MAX_BYTES:
+        return news_text
+    # 文字の途中で切れた末尾のバイトは捨てる
+    return encoded[:NEWS_TEXT_MAX_BYTES].decode("utf-8", errors="ignore")
+
+
+def _sentiment_cache_key(ticker: str, news_text: str) -> str:
+    """銘柄とニュース本文（プロンプトに使う範囲）からキャッシュキーを作成"""
+    return hashlib.sha256(f"{ticker}|{_truncate_news_text(news_text)}".encode("utf-8")).hexdigest()
+
+
+def _load_cached_sentiment(key: str) -> Optional[Tuple[int, str]]:
+    """キャッシュ済みの (スコア, 理由) を取得（なければNone）"""
+    conn = _get_sentiment_cache()
+    if conn is None:
+        return None
+    try:
+        with _sentiment_cache_lock:
+            row = conn.execute(
+                "SELECT score, reason FROM news_sentiment WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+    except Exception:
+        return None
+
+
+def _save_cached_sentiment(key: str, score: int, reason: str):
+    """分析結果をキャッシュに保存（失敗しても分析結果はそのまま返す）"""
+    conn = _get_sentiment_cache()
+    if conn is None:
+        return
+    try:
+        with _sentiment_cache_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO news_sentiment (key, score, reason, ts) VALUES (?, ?, ?, ?)",
+                (key, score, reason, int(time.time()))
+            )
+    except Exception as e:
+        print(f"Sentiment cache save error: {e}")
+
+
+# 生成済みのGeminiモデル（作成に成功した場合のみ保持し、全インスタンスで共有）
+_gemini_model = None
+_gemini_model_lock = threading.Lock()
 
 
 # Gemini API設定
 def get_gemini_model():
-    """Gemini APIモデルを取得"""
+    """
+    Gemini APIモデルを取得
+    
+    モデルはプロセス内で1つだけ作成して使い回す（genai.configure も初回のみ）。
+    APIキー未設定や作成失敗の場合は保持せず、次回の呼び出しで再試行する
+    """
+    global _gemini_model
+    if _gemini_model is not None:
+        return _gemini_model
+    
+    with _gemini_model_lock:
+        if _gemini_model is None:
+            _gemini_model = _create_gemini_model()
+        return _gemini_model
+
+
+def _create_gemini_model():
+    """Gemini APIモデルを作成（APIキーがなければNone）"""
     try:
         import google.generativeai as genai
         
@@ -47,8 +275,18 @@ class SentimentAnalyzer:
     """ニュース感情分析クラス"""
     
     def __init__(self):
-        self.model = get_gemini_model()
-        self._cache = {}  # メモリキャッシュ
+        self._cache = {}  # メモリキャッシュ（当日分のみ保持）
+        self._cache_date = None
+    
+    @property
+    def model(self):
+        """
+        Geminiモデル（未作成なら get_gemini_model で作成を試みる）
+        
+        インスタンスはプロセス内で共有されるため、作成時のモデルを保持せず毎回取得する。
+        APIキーが後から設定された場合も再起動なしで利用可能になる
+        """
+        return get_gemini_model()
     
     def is_available(self) -> bool:
         """Gemini APIが利用可能かどうか"""
@@ -65,65 +303,151 @@ class SentimentAnalyzer:
         Returns:
             (スコア 0-100, 理由/要約)
         """
+        score, reason, _ = self._analyze_news(ticker, news_text)
+        return score, reason
+    
+    def _analyze_news(self, ticker: str, news_text: str) -> Tuple[int, str, bool]:
+        """
+        analyze_news の本体
+        
+        Returns:
+            (スコア 0-100, 理由/要約, Geminiの分析結果か)。失敗時のスコアは中立の50
+        """
         if not self.model:
-            return 50, "Gemini API未設定"
+            return 50, "Gemini API未設定", False
         
-        prompt = f"""
-あなたはプロの証券アナリストです。以下のニュースを読み、
-対象銘柄({ticker})の株価にとってポジティブかネガティブかを判定してください。
-
-出力ルール:
-- 0(超悲観)〜100(超楽観)、50を中立とする整数スコア
-- 短い理由（日本語で1-2文）
-
-ニュース:
-{news_text[:2000]}
-
-出力フォーマット(JSON):
-{{"score": 整数, "reason": "理由の文字列"}}
-"""
+        # 同じニュースを分析済みならGeminiを呼ばない
+        cache_key = _sentiment_cache_key(ticker, news_text)
+        cached = _load_cached_sentiment(cache_key)
+        if cached is not None:
+            return (*cached, True)
+        
+        prompt = _NEWS_PROMPT_TEMPLATE.format(ticker=ticker, news=_truncate_news_text(news_text))
+        
+        text, error = self._generate_text(prompt)
+        if text is None:
+            return 50, error, False
+        
+        try:
+            data = json.loads(_strip_code_fence(text))
+            score = max(0, min(100, int(data.get("score", 50))))
+            reason = data.get("reason", "分析完了")
+            _save_cached_sentiment(cache_key, score, reason)
+            return score, reason, True
+        except json.JSONDecodeError:
+            # JSONパースに失敗した場合、テキストから数値を抽出
+            match = _NUM_RE.search(text)
+            if match:
+                score = max(0, min(100, int(match.group())))
+                _save_cached_sentiment(cache_key, score, "分析完了（部分解析）")
+                return score, "分析完了（部分解析）", True
+            return 50, "解析エラー", False
+        except Exception as e:
+            return 50, f"Error: {str(e)[:50]}...", False
+    
+    def analyze_news_batch(self, ticker: str, news_texts: List[str]) -> List[Tuple[int, str]]:
+        """
+        同じ銘柄の複数ニュースを1回のGemini呼び出しでまとめて分析
+        
+        キャッシュ済みのニュースは送らず、残りを番号付きで1つのプロンプトにまとめる。
+        応答から取り出せなかったニュースだけ analyze_news で個別に分析する
+        
+        Args:
+            ticker: 銘柄コード
+            news_texts: ニュース本文のリスト
+        
+        Returns:
+            news_texts と同じ順の (スコア 0-100, 理由/要約) のリスト
+        """
+        return self._analyze_news_batch(ticker, news_texts)[0]
+    
+    def _analyze_news_batch(self, ticker: str, news_texts: List[str]) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        analyze_news_batch の本体
+        
+        Returns:
+            (news_texts と同じ順の (スコア 0-100, 理由/要約) のリスト, すべてGeminiの分析結果か)
+        """
+        if not self.model:
+            return [(50, "Gemini API未設定")] * len(news_texts), False
+        
+        keys = [_sentiment_cache_key(ticker, text) for text in news_texts]
+        results = [_load_cached_sentiment(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        if len(pending) > 1:
+            items = "\n\n".join(
+                f"{n}. {_truncate_news_text(news_texts[i])}" for n, i in enumerate(pending, 1)
+            )
+            prompt = _NEWS_BATCH_PROMPT_TEMPLATE.format(ticker=ticker, items=items)
+            text, error = self._generate_text(prompt)
+            if text is None:
+                # API自体が失敗した場合は個別に再送せずエラーを返す
+                for i in pending:
+                    results[i] = (50, error)
+                return results, False
+            
+            parsed = {}
+            try:
+                for item in json.loads(_strip_code_fence(text)).get("results", []):
+                    parsed[int(item["id"])] = (
+                        max(0, min(100, int(item.get("score", 50)))),
+                        item.get("reason", "分析完了")
+                    )
+            except Exception:
+                pass
+            
+            for n, i in enumerate(pending, 1):
+                if n in parsed:
+                    results[i] = parsed[n]
+                    _save_cached_sentiment(keys[i], *parsed[n])
+            pending = [i for i in pending if results[i] is None]
+        
+        # まとめて分析できなかった分は個別に分析（API待ちが支配的なため並列に呼び出す）
+        all_ok = True
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(NEWS_ANALYSIS_MAX_WORKERS, len(pending))) as executor:
+                fallback = executor.map(lambda i: self._analyze_news(ticker, news_texts[i]), pending)
+                for i, (score, reason, ok) in zip(pending, fallback):
+                    results[i] = (score, reason)
+                    all_ok = all_ok and ok
         
-        # 指数バックオフによるリトライ（最大5回）
+        return results, all_ok
+    
+    def _generate_text(self, prompt: str) -> Tuple[Optional[str], str]:
+        """
+        Geminiにプロンプトを送信し、応答テキストを取得
+        
+        Args:
+            prompt: プロンプト
+        
+        Returns:
+            (応答テキスト, エラーメッセージ)。失敗時は応答テキストがNone
+        """
+        # 共有ペースで送信し、429ならペースを落としてリトライ（最大5回）
         max_retries = 5
-        base_delay = 4  # 基本待機時間（秒）
 
         for attempt in range(max_retries):
             try:
+                _gemini_rate.acquire()
                 response = self.model.generate_content(prompt)
-                text = response.text.replace("```json", "").replace("```", "").strip()
-                data = json.loads(text)
-                score = int(data.get("score", 50))
-                reason = data.get("reason", "分析完了")
-                return max(0, min(100, score)), reason
-            except json.JSONDecodeError:
-                # JSONパースに失敗した場合、テキストから数値を抽出
-                try:
-                    import re
-                    numbers = re.findall(r'\d+', response.text)
-                    if numbers:
-                        score = int(numbers[0])
-                        return max(0, min(100, score)), "分析完了（部分解析）"
-                except:
-                    pass
-                return 50, "解析エラー"
+                _gemini_rate.on_success()
+                return response.text, ""
             except Exception as e:
                 error_msg = str(e)
                 # 429 (Rate Limit) エラーの場合はリトライ
                 if "429" in error_msg or "quota" in error_msg.lower():
+                    _gemini_rate.on_rate_limited()
                     if attempt < max_retries - 1:
-                        import time
-                        # 指数バックオフ: 4, 8, 16, 32...
-                        delay = base_delay * (2 ** attempt)
-                        print(f"Rate limit hit. Retrying in {delay}s...")
-                        time.sleep(delay)
+                        print(f"Rate limit hit. Retrying at {_gemini_rate.rpm:.1f} RPM...")
                         continue
                 
                 # エラーメッセージを生成
                 if "429" in error_msg or "quota" in error_msg.lower():
-                    return 50, "⚠️ API制限 (時間をおいて再試行)"
-                return 50, f"Error: {error_msg[:50]}..."
+                    return None, "⚠️ API制限 (時間をおいて再試行)"
+                return None, f"Error: {error_msg[:50]}..."
         
-        return 50, "リトライ上限到達"
+        return None, "リトライ上限到達"
     
     def get_news(self, ticker: str) -> List[Dict]:
         """
@@ -149,20 +473,22 @@ class SentimentAnalyzer:
         # 日本株コード対応 (末尾の.Tを削除して検索)
         search_ticker = ticker.replace(".T", "")
         try:
-            import urllib.request
+            import io
             import xml.etree.ElementTree as ET
             
-            query = f"{search_ticker} 株 ニュース"
-            encoded_query = urllib.parse.quote(query)
             # hl=ja&gl=JP&ceid=JP:ja で日本語ニュース指定
-            url = f"https://news.google.com/rss/search?q={encoded_query}&hl=ja&gl=JP&ceid=JP:ja"
-            
-            with urllib.request.urlopen(url, timeout=5) as response:
-                xml_data = response.read()
+            response = _get_http_session().get(
+                "https://news.google.com/rss/search",
+                params={"q": f"{search_ticker} 株 ニュース", "hl": "ja", "gl": "JP", "ceid": "JP:ja"},
+                timeout=5
+            )
+            response.raise_for_status()
+                
+            # フィード全体のツリーは作らず、itemの終了タグを順に読んで5件で打ち切る
+            for _, item in ET.iterparse(io.BytesIO(response.content), events=('end',)):
+                if item.tag != 'item':
+                    continue
                 
-            root = ET.fromstring(xml_data)
-            
-            for item in root.findall('.//item')[:5]:
                 title = item.find('title').text if item.find('title') is not None else "No Title"
                 link = item.find('link').text if item.find('link') is not None else ""
                 
@@ -179,18 +505,62 @@ class SentimentAnalyzer:
                     'publisher': source,
                     'summary': title # RSSにはsummaryがないことが多いのでタイトルで代用
                 })
+                item.clear()
+                if len(news_items) >= 5:
+                    break
                 
         except Exception as e:
             print(f"RSS fetch error for {ticker}: {e}")
             
         return news_items
     
-    def get_sentiment(self, ticker: str) -> Tuple[int, str, List[Dict]]:
+    def get_news_many(self, tickers: List[str]) -> Dict[str, List[Dict]]:
+        """
+        複数銘柄のニュースを並列に取得
+        
+        Args:
+            tickers: 銘柄コードのリスト
+        
+        Returns:
+            {銘柄コード: ニュースのリスト} の辞書
+        """
+        if not tickers:
+            return {}
+        
+        # HTTP待ちが支配的なため並列に取得
+        with ThreadPoolExecutor(max_workers=min(NEWS_FETCH_MAX_WORKERS, len(tickers))) as executor:
+            return dict(zip(tickers, executor.map(self.get_news, tickers)))
+    
+    def _store_cache(self, cache_key: str, today: str, result: Tuple[int, str, List[Dict]]):
+        """
+        当日分の分析結果をメモリキャッシュに保存
+        
+        インスタンスはプロセス内で共有されるため、日付が変わったら前日までの結果を捨てる
+        """
+        if self._cache_date != today:
+            self._cache = {}
+            self._cache_date = today
+        self._cache[cache_key] = result
+    
+    def has_cached_sentiment(self, ticker: str) -> bool:
+        """
+        当日分の分析結果がメモリキャッシュにあるか（ニューステキストの先読み要否の判定用）
+        
+        Args:
+            ticker: 銘柄コード
+        
+        Returns:
+            キャッシュ済みならTrue
+        """
+        return f"{ticker}_{date.today().isoformat()}" in self._cache
+    
+    def get_sentiment(self, ticker: str, news_list: Optional[List[Dict]] = None) -> Tuple[int, str, List[Dict]]:
         """
         銘柄のニュース感情を分析
         
         Args:
             ticker: 銘柄コード
+            news_list: 取得済みのニュース（get_news_many の結果など。Noneならここで取得）
         
         Returns:
             (総合スコア, 要約, 個別ニュース分析結果)
@@ -202,29 +572,27 @@ class SentimentAnalyzer:
         if cache_key in self._cache:
             return self._cache[cache_key]
         
-        # ニュース取得
-        news_list = self.get_news(ticker)
+        # ニュース取得（取得済みなら再取得しない）
+        if news_list is None:
+            news_list = self.get_news(ticker)
         
+        # ニュースなしはキャッシュしない（get_news は取得失敗時も空リストを返すため）
         if not news_list:
-            result = (50, "ニュースが見つかりません", [])
-            self._cache[cache_key] = result
-            return result
+            return (50, "ニュースが見つかりません", [])
         
+        # 未設定はキャッシュしない（APIキーが設定されたら次の呼び出しから分析する）
         if not self.is_available():
-            result = (50, "Gemini API未設定", [])
-            self._cache[cache_key] = result
-            return result
+            return (50, "Gemini API未設定", [])
+        
+        # 各ニュースを1回の呼び出しでまとめて分析
+        titles = [news.get('title', '') for news in news_list]
+        texts = [f"{title}\n{news.get('summary', title)}" for title, news in zip(titles, news_list)]
+        analyses, all_ok = self._analyze_news_batch(ticker, texts)
         
-        # 各ニュースを分析
         results = []
         total_score = 0
         
-        for news in news_list:
-            title = news.get('title', '')
-            summary = news.get('summary', title)
-            
-            score, reason = self.analyze_news(ticker, f"{title}\n{summary}")
-            
+        for news, title, (score, reason) in zip(news_list, titles, analyses):
             results.append({
                 'title': title,
                 'score': score,
@@ -245,16 +613,29 @@ class SentimentAnalyzer:
             summary = "➡️ 中立的なニュース"
         
         result = (avg_score, summary, results)
-        self._cache[cache_key] = result
+        # API制限などで分析できなかったニュースを含む結果は、次の呼び出しで再分析する
+        if all_ok:
+            self._store_cache(cache_key, today, result)
         
         return result
 
 
+@st.cache_resource(show_spinner=False)
+def get_sentiment_analyzer() -> SentimentAnalyzer:
+    """
+    共有のSentimentAnalyzerを取得
+    
+    Geminiクライアントの初期化はプロセスにつき1回だけ行い、
+    当日分の分析結果キャッシュもセッション間で共有する
+    """
+    return SentimentAnalyzer()
+
+
 def render_sentiment_panel(ticker: str):
     """
     感情分析パネルをStreamlitで表示
     """
-    analyzer = SentimentAnalyzer()
+    analyzer = get_sentiment_analyzer()
     
     if not analyzer.is_available():
         st.warning("⚠️ Gemini APIキーが設定されていません。Secretsに`GEMINI_API_KEY`を追加してください。")
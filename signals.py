@@ -3,9 +3,9 @@
 環境認識・セットアップ・トリガーの3段階判定
 """
 import pandas as pd
+import numpy as np
 from typing import Tuple, Optional
-from indicators import add_indicators, is_near_ema20
-from patterns import detect_patterns
+from indicators import is_near_ema20
 
 
 class TrendState:
@@ -15,6 +15,13 @@ class TrendState:
     NEUTRAL = "レンジ"
 
 
+class TrendDirection:
+    """トレンド方向（表示分岐用の機械可読な値）"""
+    UP = "up"
+    DOWN = "down"
+    FLAT = "flat"
+
+
 class SignalType:
     """シグナルタイプ"""
     LONG = "買いシグナル"
@@ -35,14 +42,17 @@ def analyze_trend(df: pd.DataFrame) -> str:
     if df.empty or 'ema_200' not in df.columns:
         return TrendState.NEUTRAL
     
-    latest = df.iloc[-1]
+    # 最終足の値はSeriesを作らずndarrayからスカラーで取り出す
+    close = df['close'].to_numpy()[-1]
+    ema_200 = df['ema_200'].to_numpy()[-1]
     
-    if pd.isna(latest['ema_200']):
+    # NaNは自身と等しくならない
+    if ema_200 != ema_200:
         return TrendState.NEUTRAL
     
-    if latest['close'] > latest['ema_200']:
+    if close > ema_200:
         return TrendState.UPTREND
-    elif latest['close'] < latest['ema_200']:
+    elif close < ema_200:
         return TrendState.DOWNTREND
     else:
         return TrendState.NEUTRAL
@@ -96,6 +106,55 @@ def check_setup(row: pd.Series, is_long: bool) -> bool:
         return near_ema or rsi_condition
 
 
+def check_setup_arr(
+    ema_20_distance: np.ndarray,
+    rsi: np.ndarray,
+    i: int,
+    is_long: bool
+) -> bool:
+    """
+    セットアップ条件を配列のi番目の足について確認（check_setup の配列版）
+    
+    Args:
+        ema_20_distance: ema_20_distance列の配列
+        rsi: rsi列の配列
+        i: 判定する足の位置（-1で最終足）
+        is_long: ロング（買い）セットアップを確認するか
+    
+    Returns:
+        セットアップ条件を満たしているか
+    """
+    return check_setup_values(ema_20_distance[i], rsi[i], is_long)
+
+
+def check_setup_values(ema_20_distance: float, rsi: float, is_long: bool) -> bool:
+    """
+    セットアップ条件を指標値から確認（check_setup のスカラー版）
+    
+    Args:
+        ema_20_distance: 20EMAからの乖離率（%）
+        rsi: RSI値
+        is_long: ロング（買い）セットアップを確認するか
+    
+    Returns:
+        セットアップ条件を満たしているか
+    """
+    # NaNとの比較はFalseになるため、欠損時は条件不成立
+    near_ema = -1.0 <= ema_20_distance <= 1.0
+    
+    if is_long:
+        # 買いセットアップ: 20EMA付近まで下落 or RSI < 40
+        return bool(near_ema or rsi < 40)
+    else:
+        # 売りセットアップ: 20EMA付近まで上昇 or RSI > 60
+        return bool(near_ema or rsi > 60)
+
+
+# トリガーとなるパターン値と説明（ピンバーを包み足より優先して判定）
+_LONG_TRIGGERS = {"bullish_pin": "下ヒゲピンバー", "bullish_engulfing": "陽線包み足"}
+_SHORT_TRIGGERS = {"bearish_pin": "上ヒゲピンバー", "bearish_engulfing": "陰線包み足"}
+
+
 def check_trigger(row: pd.Series, is_long: bool) -> Tuple[bool, str]:
     """
     トリガー条件を確認（ローソク足パターン）
@@ -107,25 +166,36 @@ def check_trigger(row: pd.Series, is_long: bool) -> Tuple[bool, str]:
     Returns:
         (トリガー発生か, トリガーの説明)
     """
-    pin_bar = row.get('pin_bar', 'none')
-    engulfing = row.get('engulfing', 'none')
+    return check_trigger_values(row.get('pin_bar', 'none'), row.get('engulfing', 'none'), is_long)
+
+
+def check_trigger_values(pin_bar: str, engulfing: str, is_long: bool) -> Tuple[bool, str]:
+    """
+    トリガー条件をパターン値から確認（check_trigger のスカラー版）
     
-    if is_long:
-        # 買いトリガー: 下ヒゲピンバー or 陽線包み足
-        if pin_bar == "bullish_pin":
-            return True, "下ヒゲピンバー"
-        if engulfing == "bullish_engulfing":
-            return True, "陽線包み足"
-    else:
-        # 売りトリガー: 上ヒゲピンバー or 陰線包み足
-        if pin_bar == "bearish_pin":
-            return True, "上ヒゲピンバー"
-        if engulfing == "bearish_engulfing":
-            return True, "陰線包み足"
+    Args:
+        pin_bar: pin_bar列の値
+        engulfing: engulfing列の値
+        is_long: ロング（買い）トリガーを確認するか
     
+    Returns:
+        (トリガー発生か, トリガーの説明)
+    """
+    # 買い: 下ヒゲピンバー or 陽線包み足 / 売り: 上ヒゲピンバー or 陰線包み足
+    triggers = _LONG_TRIGGERS if is_long else _SHORT_TRIGGERS
+    desc = triggers.get(pin_bar) or triggers.get(engulfing)
+    if desc:
+        return True, desc
     return False, ""
 
 
+def _last_pattern(df: pd.DataFrame, column: str) -> str:
+    """パターン列の最終足の値を取得（列がなければ'none'）"""
+    if column not in df.columns:
+        return 'none'
+    return df[column].to_numpy()[-1]
+
+
 def calculate_risk_reward(
     df: pd.DataFrame,
     is_long: bool,
@@ -147,17 +217,17 @@ def calculate_risk_reward(
     if len(df) < lookback:
         lookback = len(df)
     
-    recent = df.tail(lookback)
-    current_price = df.iloc[-1]['close']
+    # 必要な列だけndarrayで取り出し、直近lookback本をスライスで参照（pandasの集計を経由しない）
+    current_price = df['close'].to_numpy()[-1]
     
     if is_long:
-        # 買いの場合: 直近安値を損切りライン
-        stop_loss = recent['low'].min()
+        # 買いの場合: 直近安値を損切りライン（欠損はpandasのmin同様に無視）
+        stop_loss = np.nanmin(df['low'].to_numpy()[-lookback:])
         risk = current_price - stop_loss
         take_profit = current_price + (risk * rr_ratio)
     else:
         # 売りの場合: 直近高値を損切りライン
-        stop_loss = recent['high'].max()
+        stop_loss = np.nanmax(df['high'].to_numpy()[-lookback:])
         risk = stop_loss - current_price
         take_profit = current_price - (risk * rr_ratio)
     
@@ -188,6 +258,7 @@ def generate_signal(
     result = {
         "signal": SignalType.NONE,
         "trend": "",
+        "trend_direction": TrendDirection.FLAT,
         "setup": False,
         "trigger": "",
         "risk_reward": None,
@@ -202,19 +273,28 @@ def generate_signal(
     long_env, short_env, trend_desc = check_environment(df_main, df_higher)
     result["trend"] = trend_desc
     
-    current = df_main.iloc[-1]
+    # 最終足の判定に使う値だけを各列の配列から1回ずつ取り出す（行のSeriesは作らない）
+    latest = {
+        'ema_20_distance': df_main['ema_20_distance'].to_numpy()[-1],
+        'rsi': df_main['rsi'].to_numpy()[-1],
+        'pin_bar': _last_pattern(df_main, 'pin_bar'),
+        'engulfing': _last_pattern(df_main, 'engulfing')
+    }
     
     # 2. セットアップ確認
     if long_env:
+        result["trend_direction"] = TrendDirection.UP
         result["details"].append("✓ 上昇トレンド環境")
-        setup_ok = check_setup(current, is_long=True)
+        setup_ok = check_setup_values(latest['ema_20_distance'], latest['rsi'], is_long=True)
         if setup_ok:
             result["setup"] = True
             result["details"].append("✓ 押し目ゾーン（20EMA付近 or RSI<40）")
             result["current_state"] = "押し目待ち"
             
             # 3. トリガー確認
-            trigger_ok, trigger_desc = check_trigger(current, is_long=True)
+            trigger_ok, trigger_desc = check_trigger_values(
+                latest['pin_bar'], latest['engulfing'], is_long=True
+            )
             if trigger_ok:
                 result["signal"] = SignalType.LONG
                 result["trigger"] = trigger_desc
@@ -223,15 +303,18 @@ def generate_signal(
                 result["risk_reward"] = calculate_risk_reward(df_main, is_long=True)
     
     elif short_env:
+        result["trend_direction"] = TrendDirection.DOWN
         result["details"].append("✓ 下落トレンド環境")
-        setup_ok = check_setup(current, is_long=False)
+        setup_ok = check_setup_values(latest['ema_20_distance'], latest['rsi'], is_long=False)
         if setup_ok:
             result["setup"] = True
             result["details"].append("✓ 戻りゾーン（20EMA付近 or RSI>60）")
             result["current_state"] = "戻り待ち"
             
             # 3. トリガー確認
-            trigger_ok, trigger_desc = check_trigger(current, is_long=False)
+            trigger_ok, trigger_desc = check_trigger_values(
+                latest['pin_bar'], latest['engulfing'], is_long=False
+            )
             if trigger_ok:
                 result["signal"] = SignalType.SHORT
                 result["trigger"] = trigger_desc
@@ -242,3 +325,40 @@ def generate_signal(
         result["details"].append("△ トレンド不明確（様子見）")
     
     return result
+
+
+def compute_tech_score(close, ema_20, ema_200, rsi):
+    """
+    テクニカルスコア（価格ボーナス込み）とランクを計算（配列対応）
+    
+    Args:
+        close: 終値（スカラーまたは配列）
+        ema_20: 20EMA
+        ema_200: 200EMA
+        rsi: RSI
+    
+    Returns:
+        (スコアの配列, ランクの配列)
+    """
+    close = np.atleast_1d(np.asarray(close, dtype=float))
+    ema_20 = np.atleast_1d(np.asarray(ema_20, dtype=float))
+    ema_200 = np.atleast_1d(np.asarray(ema_200, dtype=float))
+    rsi = np.atleast_1d(np.asarray(rsi, dtype=float))
+    
+    # トレンド（40点）
+    score = np.where(close > ema_200, 20, 0) + np.where(ema_20 > ema_200, 20, 0)
+    # モメンタム（40点）
+    score += np.select(
+        [(rsi >= 30) & (rsi <= 40), rsi < 30, (rsi > 40) & (rsi <= 60)],
+        [30, 25, 20],
+        default=0
+    )
+    # 出来高（10点デフォルト）
+    score += 10
+    # 価格ボーナス
+    score += np.where(close < 1000, 10, np.where(close < 3000, 5, 0))
+    
+    # ランク判定
+    rank = np.select([score >= 80, score >= 60, score >= 40], ["S", "A", "B"], default="C")
+    
+    return score, rank
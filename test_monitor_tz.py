@@ -0,0 +1,60 @@
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import monitor
+
+# ネットワークを使わず、一括取得(yf.download)と銘柄ごと取得(Ticker.history)の4時間足を比較する
+TIMEZONES = {"7203.T": "Asia/Tokyo", "AAPL": "America/New_York"}
+HOURS = {"7203.T": [9, 10, 11, 12, 13, 14], "AAPL": [9.5, 10.5, 11.5, 12.5, 13.5, 14.5, 15.5]}
+
+
+def make_history(ticker):
+    # Ticker.history 相当: 取引所のタイムゾーンの1時間足
+    days = pd.bdate_range("2026-09-01", "2026-09-30")
+    idx = pd.DatetimeIndex([
+        pd.Timestamp(d.date()) + pd.Timedelta(hours=h) for d in days for h in HOURS[ticker]
+    ]).tz_localize(TIMEZONES[ticker])
+    close = 100 + np.arange(len(idx), dtype=float)
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000.0},
+        index=idx
+    )
+
+
+class FakeTicker:
+    def __init__(self, ticker):
+        self.fast_info = {"timezone": TIMEZONES[ticker]}
+
+
+def test_tokyo_4h_buckets_match_history():
+    history = {t: make_history(t) for t in TIMEZONES}
+    # yf.download 相当: 全銘柄を共通のタイムゾーンに揃えて結合
+    data = pd.concat(
+        {t: df.tz_convert("America/New_York") for t, df in history.items()}, axis=1, sort=True
+    )
+
+    original = yf.download, yf.Ticker
+    yf.download = lambda *args, **kwargs: data
+    yf.Ticker = FakeTicker
+    monitor._exchange_timezone.cache_clear()
+    try:
+        frames = monitor.fetch_watchlist_data(list(TIMEZONES), "1mo", "1h")
+    finally:
+        yf.download, yf.Ticker = original
+        monitor._exchange_timezone.cache_clear()
+
+    for ticker, df in history.items():
+        expected = monitor.resample_4h(df.rename(columns=str.lower))
+        actual = monitor.resample_4h(frames[ticker].rename(columns=str.lower))
+        assert actual.index.equals(expected.index), ticker
+        assert np.allclose(actual.to_numpy(), expected.to_numpy()), ticker
+
+
+def main():
+    test_tokyo_4h_buckets_match_history()
+    print("OK: 7203.T / AAPL の4時間足が銘柄ごと取得と一致")
+
+
+if __name__ == "__main__":
+    main()
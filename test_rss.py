@@ -48,8 +48,15 @@ def get_google_news(ticker, limit=5):
 
 # テスト
 tickers = ["7203", "9984", "4502"]  # トヨタ, ソフトバンク, 武田薬品
-for t in tickers:
-    print(f"\n--- {t} ---")
-    items = get_google_news(t)
-    for i in items:
-        print(f"[{i['publisher']}] {i['title']}")
+
+
+def main():
+    for t in tickers:
+        print(f"\n--- {t} ---")
+        items = get_google_news(t)
+        for i in items:
+            print(f"[{i['publisher']}] {i['title']}")
+
+
+if __name__ == "__main__":
+    main()